@@ -1,66 +1,155 @@
 # coding: utf-8
 import os
+import struct
+import collections
+import multiprocessing
 
 try:
     from PIL import Image
 except:
     pass
 
-from deworld.map_colors import HeightColorMap, RGBColorMap
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.map_colors import (HeightColorMap, RGBColorMap, TemperatureColorMap, WetnessColorMap, SoilColorMap,
+                                 WindColorMap)
+from deworld.world import CellInfo
 from deworld.layers import VEGETATION_TYPE
+from deworld.utils import downsample_array
+from deworld.exceptions import DeworldException
+
+
+BLACK = RGBColorMap.get_color(r=0.0, g=0.0, b=0.0)
+
+VEGETATION_COLORS = {VEGETATION_TYPE.DESERT: RGBColorMap.get_color(r=244.0/256, g=164.0/256, b=96.0/256),
+                     VEGETATION_TYPE.GRASS: RGBColorMap.get_color(r=55.0/256, g=200.0/256, b=55.0/256),
+                     VEGETATION_TYPE.FOREST: RGBColorMap.get_color(r=55.0/256, g=125.0/256, b=55.0/256)}
+
+# position of power point in image (it is passed to worker processes instead of point)
+PointPosition = collections.namedtuple('PointPosition', ['x', 'y'])
+
+# colors of vegetation, indexed by vegetation type
+VEGETATION_COLORS_ARRAY = None if np is None else np.array([VEGETATION_COLORS.get(vegetation_type, BLACK).rgb
+                                                            for vegetation_type in xrange(max(VEGETATION_COLORS)+1)], dtype=np.uint8)
+
+
+# fields of cells, which are downsampled by most frequent values instead of means
+MODE_FIELDS = ('vegetation',)
+
+
+def _viewport_rect(viewport, w, h, downsample=1):
+    '''
+    viewport (x, y, w, h) cropped by world bounds, top left cell of viewport MUST be inside world
+    '''
+    if downsample < 1:
+        raise DeworldException('downsample MUST be positive, not %r' % downsample)
+
+    x, y, viewport_w, viewport_h = (0, 0, w, h) if viewport is None else viewport
+
+    if not (0 <= x < w and 0 <= y < h):
+        raise DeworldException('viewport %r starts outside of world %dx%d' % (viewport, w, h))
 
+    if viewport_w < 1 or viewport_h < 1:
+        raise DeworldException('viewport %r is empty' % (viewport,))
 
-def draw_image(turn, catalog, layer, power_points, colorizer):
+    return x, y, min(viewport_w, w - x), min(viewport_h, h - y)
+
+def viewport_points(power_points, viewport, downsample=1):
+    '''
+    positions (PointPosition) of power points inside viewport (x, y, w, h) in coordinates of viewport image
+    '''
+    x, y, w, h = viewport
+    return dict((name, PointPosition(x=(point.x - x) // downsample, y=(point.y - y) // downsample))
+                for name, point in power_points.items()
+                if x <= point.x < x + w and y <= point.y < y + h)
+
+def viewport_cells(world, viewport=None, downsample=1):
+    '''
+    CellInfo with arrays of cells inside viewport (x, y, w, h) of world (whole world by default),
+    every downsample x downsample block of cells is replaced by mean of its values (by most frequent value for MODE_FIELDS)
+    returns cells and positions of power points in coordinates of arrays
+    '''
+    viewport = _viewport_rect(viewport, world.w, world.h, downsample)
+
+    cells = CellInfo(*[downsample_array(values, downsample, mode=field_name in MODE_FIELDS)
+                       for field_name, values in zip(CellInfo._fields, world.cells_arrays(*viewport))])
+
+    return cells, viewport_points(world.power_points, viewport, downsample)
+
+def draw_image(turn, catalog, layer, power_points, colorizer, viewport=None, downsample=1):
+    '''
+    viewport - rectangle (x, y, w, h) of layer to draw (whole layer by default),
+    downsample - only one (top left) cell of every downsample x downsample block is drawn
+    '''
+    x, y, w, h = _viewport_rect(viewport, layer.w, layer.h, downsample)
 
     if not os.path.exists(catalog):
         os.makedirs(catalog)
 
-    img = Image.new('RGB', (layer.w, layer.h))
+    # rows of atmosphere grid (arrays storage) support only integer indexes
+    rows = []
+    for row_y in xrange(y, y+h, downsample):
+        row = layer.data[row_y]
+        rows.append([row[cell_x] for cell_x in xrange(x, x+w, downsample)])
+
+    img = Image.new('RGB', (len(rows[0]), len(rows)))
 
     data = []
-    for row in layer.data:
+    for row in rows:
         for cell in row:
             data.append(colorizer(cell, discret=False).rgb)
 
-    for point in power_points.values():
-        data[point.y * layer.w + point.x] = (0, 0, 0)
+    for point in viewport_points(power_points, (x, y, w, h), downsample).values():
+        data[point.y * img.size[0] + point.x] = (0, 0, 0)
 
     img.putdata(data)
     img.save('%s/%.3d.png' % (catalog, turn))
 
-def wind_colorizer(wind, discret=False):
-    r, g, b = 0.5, 0.5, 0.5
+def colorize_array(values, power_points, colorizer):
+    '''
+    uint8 array of rgb colors of cells: values - array of layer cells (see World.cells_arrays),
+    colorizer - array colorizer, which returns colors for all cells
+    '''
+    colors = np.array(colorizer(values, discret=False), dtype=np.uint8)
 
-    g += wind[0] * 0.5
-    b += wind[1] * 0.5
+    h, w = colors.shape[:2]
 
-    return RGBColorMap.get_color(r=r, g=g, b=b)
+    for point in power_points.values():
+        if 0 <= point.x < w and 0 <= point.y < h:
+            colors[point.y, point.x] = 0
 
-def temperature_colorizer(temp, discret=False):
-    r, g, b = 0.5, 0.5, 0.5
+    return colors
 
-    if temp < 0.5:
-        b += temp
-    else:
-        r += (temp - 0.5)
+def _colors_image(colors):
+    h, w = colors.shape[:2]
+    return Image.frombuffer('RGB', (w, h), np.ascontiguousarray(colors), 'raw', 'RGB', 0, 1)
 
-    return RGBColorMap.get_color(r=r, g=g, b=b)
+def draw_array(turn, catalog, values, power_points, colorizer):
+    '''
+    array version of draw_image (see colorize_array)
+    '''
+    if not os.path.exists(catalog):
+        os.makedirs(catalog)
+
+    _colors_image(colorize_array(values, power_points, colorizer)).save('%s/%.3d.png' % (catalog, turn))
+
+def wind_colorizer(wind, discret=False):
+    return WindColorMap.get_wind_color(wind, discret=discret)
+
+def temperature_colorizer(temp, discret=False):
+    return TemperatureColorMap.get_color(temp, discret=discret)
 
 def wetness_colorizer(wetness, discret=False):
-    return RGBColorMap.get_color(r=1.0-wetness, g=1.0-wetness, b=1.0)
+    return WetnessColorMap.get_color(wetness, discret=discret)
 
 def vegetation_colorizer(vegetation, discret=False):
-    if vegetation == VEGETATION_TYPE.GRASS:
-        return RGBColorMap.get_color(r=55.0/256, g=200.0/256, b=55.0/256)
-    if vegetation == VEGETATION_TYPE.FOREST:
-        return RGBColorMap.get_color(r=55.0/256, g=125.0/256, b=55.0/256)
-    if vegetation == VEGETATION_TYPE.DESERT:
-        return RGBColorMap.get_color(r=244.0/256, g=164.0/256, b=96.0/256)
-
-    return RGBColorMap.get_color(r=0.0, g=0.0, b=0.0)
+    return VEGETATION_COLORS.get(vegetation, BLACK)
 
 def soil_colorizer(soil, discret=False):
-    return RGBColorMap.get_color(r=0.0, g=soil, b=0.0)
+    return SoilColorMap.get_color(soil, discret=discret)
 
 def atmo_wind_colorizer(point, discret=False):
     return wind_colorizer(point.wind, discret=discret)
@@ -72,58 +161,250 @@ def atmo_wetness_colorizer(point, discret=False):
     return wetness_colorizer(point.wetness, discret=discret)
 
 
-def draw_world(turn, world, catalog):
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'height'),
-               layer=world.layer_height,
-               power_points=world.power_points,
-               colorizer=HeightColorMap.get_color)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'temperature'),
-               layer=world.layer_temperature,
-               power_points=world.power_points,
-               colorizer=temperature_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'wind'),
-               layer=world.layer_wind,
-               power_points=world.power_points,
-               colorizer=wind_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'wetness'),
-               layer=world.layer_wetness,
-               power_points=world.power_points,
-               colorizer=wetness_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'vegetation'),
-               layer=world.layer_vegetation,
-               power_points=world.power_points,
-               colorizer=vegetation_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'soil'),
-               layer=world.layer_soil,
-               power_points=world.power_points,
-               colorizer=soil_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'atmo_wind'),
-               layer=world.layer_atmosphere,
-               power_points=world.power_points,
-               colorizer=atmo_wind_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'atmo_temperature'),
-               layer=world.layer_atmosphere,
-               power_points=world.power_points,
-               colorizer=atmo_temperature_colorizer)
-
-    draw_image(turn=turn,
-               catalog='%s/%s' % (catalog, 'atmo_wetness'),
-               layer=world.layer_atmosphere,
-               power_points=world.power_points,
-               colorizer=atmo_wetness_colorizer)
+# array colorizers, they return the same colors as colorizers above for arrays of cells
+
+def wind_array_colorizer(wind, discret=False):
+    return WindColorMap.get_wind_colors(wind, discret=discret)
+
+def temperature_array_colorizer(temp, discret=False):
+    return TemperatureColorMap.get_colors(temp, discret=discret)
+
+def wetness_array_colorizer(wetness, discret=False):
+    return WetnessColorMap.get_colors(wetness, discret=discret)
+
+def vegetation_array_colorizer(vegetation, discret=False):
+    return VEGETATION_COLORS_ARRAY[vegetation]
+
+def soil_array_colorizer(soil, discret=False):
+    return SoilColorMap.get_colors(soil, discret=discret)
+
+LAYERS_ARRAY_COLORIZERS = (('height', HeightColorMap.get_colors),
+                           ('temperature', temperature_array_colorizer),
+                           ('wind', wind_array_colorizer),
+                           ('wetness', wetness_array_colorizer),
+                           ('vegetation', vegetation_array_colorizer),
+                           ('soil', soil_array_colorizer),
+                           ('atmo_wind', wind_array_colorizer),
+                           ('atmo_temperature', temperature_array_colorizer),
+                           ('atmo_wetness', wetness_array_colorizer))
+
+
+# colorizers of cells of layers, they are used to draw world without numpy
+LAYERS_COLORIZERS = (('height', 'layer_height', HeightColorMap.get_color),
+                     ('temperature', 'layer_temperature', temperature_colorizer),
+                     ('wind', 'layer_wind', wind_colorizer),
+                     ('wetness', 'layer_wetness', wetness_colorizer),
+                     ('vegetation', 'layer_vegetation', vegetation_colorizer),
+                     ('soil', 'layer_soil', soil_colorizer),
+                     ('atmo_wind', 'layer_atmosphere', atmo_wind_colorizer),
+                     ('atmo_temperature', 'layer_atmosphere', atmo_temperature_colorizer),
+                     ('atmo_wetness', 'layer_atmosphere', atmo_wetness_colorizer))
+
+
+def draw_world(turn, world, catalog, viewport=None, downsample=1):
+    '''
+    draw all layers of world, every layer is converted to rgb array at once
+    viewport & downsample - see viewport_cells
+
+    if numpy is not installed, cells are colorized one by one (see draw_image)
+    '''
+    if np is None:
+        for field_name, attribute_name, colorizer in LAYERS_COLORIZERS:
+            draw_image(turn=turn,
+                       catalog='%s/%s' % (catalog, field_name),
+                       layer=getattr(world, attribute_name),
+                       power_points=world.power_points,
+                       colorizer=colorizer,
+                       viewport=viewport,
+                       downsample=downsample)
+        return
+
+    cells, power_points = viewport_cells(world, viewport, downsample)
+
+    for field_name, colorizer in LAYERS_ARRAY_COLORIZERS:
+        draw_array(turn=turn,
+                   catalog='%s/%s' % (catalog, field_name),
+                   values=getattr(cells, field_name),
+                   power_points=power_points,
+                   colorizer=colorizer)
+
+
+def _draw_array_task(arguments):
+    turn, catalog, values, power_points, field_name = arguments
+    draw_array(turn, catalog, values, power_points, colorizer=dict(LAYERS_ARRAY_COLORIZERS)[field_name])
+
+
+class ImageWriter(object):
+    '''
+    draw images of world in worker processes, while world is stepped
+
+    draw_world copies arrays of cells and puts them into queue of pool, images are colorized,
+    encoded and saved by workers; if there are max_pending not saved images, draw_world waits for them,
+    so memory used by queue is limited
+
+    close MUST be called to wait for all images
+
+    if numpy is not installed, images are drawn by draw_world in current process
+    '''
+
+    def __init__(self, processes=None, max_pending=18):
+        if max_pending < 1:
+            raise DeworldException('max number of pending images MUST be positive, not %r' % max_pending)
+
+        self.max_pending = max_pending
+        self.pending = collections.deque()
+        self.catalogs = set()
+        self.pool = None if np is None else multiprocessing.Pool(processes)
+
+    def _wait(self, max_pending):
+        while len(self.pending) > max_pending:
+            self.pending.popleft().get()
+
+    def draw_world(self, turn, world, catalog, viewport=None, downsample=1):
+        if self.pool is None:
+            draw_world(turn, world, catalog, viewport, downsample)
+            return
+
+        cells, power_points = viewport_cells(world, viewport, downsample)
+
+        for field_name, colorizer in LAYERS_ARRAY_COLORIZERS:
+            self._wait(self.max_pending - 1)
+
+            layer_catalog = '%s/%s' % (catalog, field_name)
+
+            # catalogs are created here once, so workers do not create them concurrently
+            if layer_catalog not in self.catalogs:
+                if not os.path.exists(layer_catalog):
+                    os.makedirs(layer_catalog)
+                self.catalogs.add(layer_catalog)
+
+            # arrays are copied, since world is changed, while they are waiting in queue
+            arguments = (turn, layer_catalog, np.array(getattr(cells, field_name)), power_points, field_name)
+
+            self.pending.append(self.pool.apply_async(_draw_array_task, (arguments,)))
+
+    def close(self):
+        if self.pool is None:
+            return
+
+        try:
+            self._wait(0)
+        finally:
+            self.pool.close()
+            self.pool.join()
+
+
+class FRAMES_FORMAT:
+    GIF = 'gif'
+    SPRITES = 'sprites'
+    STREAM = 'stream'
+
+
+# header of frame in frames stream: turn, width & height
+_FRAME_HEADER = struct.Struct('<III')
+
+def read_frames(filename):
+    '''
+    iterate over (turn, colors) frames of stream, written by FramesWriter
+    '''
+    with open(filename, 'rb') as stream:
+        for header in iter(lambda: stream.read(_FRAME_HEADER.size), ''):
+            turn, w, h = _FRAME_HEADER.unpack(header)
+            yield turn, np.frombuffer(stream.read(w * h * 3), dtype=np.uint8).reshape((h, w, 3))
+
+
+class FramesWriter(object):
+    '''
+    write images of every layer for all turns into single file of catalog instead of separate png file for every turn
+
+    frames are appended to raw stream file (<name>.frames) and encoded once in close:
+      FRAMES_FORMAT.GIF - animated gif (<name>.gif), duration - duration of frame in milliseconds;
+      FRAMES_FORMAT.SPRITES - sprite sheet png (<name>.png), frames are placed by rows of `columns` frames;
+      FRAMES_FORMAT.STREAM - stream is not encoded (see read_frames).
+
+    APNG is not supported by used Pillow version, so GIF is used for animations
+    '''
+
+    def __init__(self, catalog, format=FRAMES_FORMAT.GIF, duration=100, columns=16):
+        if np is None:
+            raise DeworldException('numpy MUST be installed to write frames')
+
+        if format not in (FRAMES_FORMAT.GIF, FRAMES_FORMAT.SPRITES, FRAMES_FORMAT.STREAM):
+            raise DeworldException('unknown frames format: %r' % format)
+
+        self.catalog = catalog
+        self.format = format
+        self.duration = duration
+        self.columns = columns
+
+        self.streams = collections.OrderedDict()
+
+        if not os.path.exists(catalog):
+            os.makedirs(catalog)
+
+    def stream_filename(self, name):
+        return os.path.join(self.catalog, '%s.frames' % name)
+
+    def add_frame(self, turn, name, colors):
+        if name not in self.streams:
+            self.streams[name] = open(self.stream_filename(name), 'wb')
+
+        h, w = colors.shape[:2]
+
+        self.streams[name].write(_FRAME_HEADER.pack(turn, w, h))
+        self.streams[name].write(np.ascontiguousarray(colors, dtype=np.uint8).tostring())
+
+    def draw_array(self, turn, name, values, power_points, colorizer):
+        self.add_frame(turn, name, colorize_array(values, power_points, colorizer))
+
+    def draw_world(self, turn, world, viewport=None, downsample=1):
+        cells, power_points = viewport_cells(world, viewport, downsample)
+
+        for field_name, colorizer in LAYERS_ARRAY_COLORIZERS:
+            self.draw_array(turn, field_name, getattr(cells, field_name), power_points, colorizer)
+
+    def _frames_images(self, name):
+        return (_colors_image(colors) for turn, colors in read_frames(self.stream_filename(name)))
+
+    def _encode_gif(self, name):
+        images = self._frames_images(name)
+        first_image = next(images)
+        first_image.save(os.path.join(self.catalog, '%s.gif' % name),
+                         save_all=True,
+                         append_images=images,
+                         duration=self.duration,
+                         loop=0)
+
+    def _encode_sprites(self, name):
+        frames = list(read_frames(self.stream_filename(name)))
+
+        h, w = frames[0][1].shape[:2]
+
+        if any(colors.shape[:2] != (h, w) for turn, colors in frames):
+            raise DeworldException('can not create sprite sheet of %r from frames of different sizes' % name)
+
+        columns = min(self.columns, len(frames))
+        rows = (len(frames) + columns - 1) // columns
+
+        sheet = np.zeros((rows * h, columns * w, 3), dtype=np.uint8)
+
+        for i, (turn, colors) in enumerate(frames):
+            row, column = divmod(i, columns)
+            sheet[row*h:(row+1)*h, column*w:(column+1)*w] = colors
+
+        _colors_image(sheet).save(os.path.join(self.catalog, '%s.png' % name))
+
+    def close(self):
+        for stream in self.streams.values():
+            stream.close()
+
+        if self.format == FRAMES_FORMAT.STREAM:
+            return
+
+        for name in self.streams:
+            if self.format == FRAMES_FORMAT.GIF:
+                self._encode_gif(name)
+            else:
+                self._encode_sprites(name)
+
+            os.remove(self.stream_filename(name))
@@ -1,5 +1,5 @@
 # coding: utf-8
 
-from deworld.configs.base_config import BaseConfig
+from deworld.configs.base_config import BaseConfig, ArraysConfig
 
-__all__ = [BaseConfig]
+__all__ = [BaseConfig, ArraysConfig]
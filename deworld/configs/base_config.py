@@ -1,8 +1,14 @@
 # coding: utf-8
 
+from deworld.layers.base_layer import STORAGE_TYPE
+
 
 class BaseConfig:
 
+    STORAGE = STORAGE_TYPE.LISTS
+
+    STEP_THREADS = 1 # threads for layers syncs, 1 - do step in current thread
+
     class LAYERS:
 
         class ATMOSPHERE:
@@ -81,3 +87,8 @@ class BaseConfig:
             POWER_PER_VEGETATION_DESERT = -0.2
             POWER_PER_VEGETATION_GRASS = 0.5
             POWER_PER_VEGETATION_FOREST = 0.75
+
+
+class ArraysConfig(BaseConfig):
+
+    STORAGE = STORAGE_TYPE.ARRAYS
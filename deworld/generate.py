@@ -8,7 +8,7 @@ from deworld.layers import LAYER_TYPE
 from deworld import power_points
 from deworld.configs import BaseConfig
 from deworld import normalizers
-from deworld.cartographer import draw_world
+from deworld.cartographer import ImageWriter
 
 # shutil.rmtree('./results', ignore_errors=True)
 
@@ -96,7 +96,13 @@ world.add_power_point(power_points.CircleAreaPoint(layer_type=LAYER_TYPE.VEGETAT
                                                    normalizer=normalizers.linear_2,
                                                    default_power=(0.0, 0.0)))
 
-for i in xrange(300):
-    print 'do step %d' % i
-    world.do_step()
-    draw_world(i, world, catalog='./results')
+image_writer = ImageWriter()
+
+def draw_step(step, world):
+    print 'do step %d' % (step-1)
+    image_writer.draw_world(step-1, world, catalog='./results')
+
+world.run(300, callback=draw_step)
+
+image_writer.close()
+world.close()
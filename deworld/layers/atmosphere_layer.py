@@ -3,8 +3,13 @@
 import math
 import collections
 
-from deworld.utils import prepair_to_approximation
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.utils import E, prepair_to_approximation, resize_array, shift_array
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
 from deworld.layers.vegetation_layer import VEGETATION_TYPE
 
 
@@ -21,7 +26,104 @@ def points_reduces(accamulator, power_and_point):
                            wetness=point.wetness*power + accamulator.wetness)
 
 
+class AtmosphereGrid(object):
+    '''
+    arrays storage of atmosphere points: structure of wind_x, wind_y, temperature & wetness channels
+    grid[y][x] works like in lists storage and returns (or accepts) AtmospherePoint
+    '''
+
+    CHANNELS_NUMBER = 4
+
+    def __init__(self, channels):
+        self.channels = channels
+
+    @classmethod
+    def create(cls, w, h, point):
+        channels = np.empty((cls.CHANNELS_NUMBER, h, w))
+        channels[0] = point.wind[0]
+        channels[1] = point.wind[1]
+        channels[2] = point.temperature
+        channels[3] = point.wetness
+        return cls(channels)
+
+    @classmethod
+    def from_points(cls, points):
+        cells = np.array([[(p[0][0], p[0][1], p[1], p[2]) for p in row] for row in points], dtype=float)
+        return cls(np.ascontiguousarray(np.rollaxis(cells, 2)))
+
+    @property
+    def wind_x(self): return self.channels[0]
+
+    @property
+    def wind_y(self): return self.channels[1]
+
+    @property
+    def wind(self): return np.rollaxis(self.channels[0:2], 0, 3)
+
+    @property
+    def temperature(self): return self.channels[2]
+
+    @property
+    def wetness(self): return self.channels[3]
+
+    @property
+    def shape(self): return self.channels.shape[1:]
+
+    def copy(self):
+        return self.__class__(self.channels.copy())
+
+    def tolist(self):
+        return [[AtmospherePoint(wind=(wind_x, wind_y), temperature=temperature, wetness=wetness)
+                 for wind_x, wind_y, temperature, wetness in zip(*row)]
+                for row in np.rollaxis(self.channels, 1).tolist()]
+
+    def __len__(self):
+        return self.channels.shape[1]
+
+    def __getitem__(self, y):
+        return AtmosphereGridRow(self.channels[:, y])
+
+    def __iter__(self):
+        for y in xrange(len(self)):
+            yield self[y]
+
+    def __eq__(self, other):
+        return isinstance(other, AtmosphereGrid) and np.array_equal(self.channels, other.channels)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class AtmosphereGridRow(object):
+
+    __slots__ = ('channels',)
+
+    def __init__(self, channels):
+        self.channels = channels
+
+    def __len__(self):
+        return self.channels.shape[1]
+
+    def __getitem__(self, x):
+        wind_x, wind_y, temperature, wetness = self.channels[:, x].tolist()
+        return AtmospherePoint(wind=(wind_x, wind_y), temperature=temperature, wetness=wetness)
+
+    def __setitem__(self, x, point):
+        self.channels[:, x] = (point.wind[0], point.wind[1], point.temperature, point.wetness)
+
+    def __iter__(self):
+        for x in xrange(len(self)):
+            yield self[x]
+
+
 class AtmosphereLayer(BaseLayer):
+
+    TYPE = LAYER_TYPE.ATMOSPHERE
+    READS = (LAYER_TYPE.VEGETATION, LAYER_TYPE.WIND, LAYER_TYPE.TEMPERATURE, LAYER_TYPE.WETNESS)
+
+    # atmosphere powers are not used between steps
+    SNAPSHOT_GRIDS = ('data',)
+
     DEFAULT = AtmospherePoint(wind=(0.0, 0.0), temperature=0.0, wetness=0.0)
 
     # configs
@@ -51,23 +153,157 @@ class AtmosphereLayer(BaseLayer):
                     continue
                 self.area_deltas.append((x, y))
 
-    def serialize(self):
-        return super(AtmosphereLayer, self).serialize()
+    def _create_grid(self, value, dtype):
+        if not self.use_arrays:
+            return super(AtmosphereLayer, self)._create_grid(value, dtype)
+        return AtmosphereGrid.create(self.w, self.h, value)
+
+    def _load_grid(self, data, dtype):
+        if np is not None and isinstance(data, np.ndarray):
+            # channels arrays (e.g. memmaps of snapshot) are used without copying
+            return self._grid_from_array(data)
+        if not self.use_arrays:
+            return data
+        if isinstance(data, AtmosphereGrid):
+            return data.copy()
+        return AtmosphereGrid.from_points(data)
+
+    def _copy_grid_into(self, grid, target):
+        np.copyto(target.channels, grid.channels)
+
+    def _grids_equal(self, grid_1, grid_2):
+        return grid_1 == grid_2
+
+    def _map_grid(self, grid, function):
+        return AtmosphereGrid(function(grid.channels))
+
+    def _crop_grid(self, grid, x, y, w, h):
+        return AtmosphereGrid(grid.channels[:, y:y+h, x:x+w])
+
+    def _grid_to_array(self, grid, dtype):
+        if not isinstance(grid, AtmosphereGrid):
+            grid = AtmosphereGrid.from_points(grid)
+        return grid.channels
+
+    def _grid_from_array(self, array):
+        if self.use_arrays:
+            return AtmosphereGrid(array)
+        return AtmosphereGrid(array).tolist()
+
+    def _dump_row(self, grid, y):
+        if not self.use_arrays:
+            return grid[y]
+        return [((wind_x, wind_y), temperature, wetness) for wind_x, wind_y, temperature, wetness in zip(*grid.channels[:, y].tolist())]
+
+    def _load_row(self, grid, y, row):
+        if self.use_arrays:
+            grid.channels[:, y] = np.array([(e[0][0], e[0][1], e[1], e[2]) for e in row], dtype=float).T
+        else:
+            grid[y] = [AtmospherePoint(wind=tuple(e[0]), temperature=e[1], wetness=e[2]) for e in row]
+
+    def _cells_array(self, array):
+        return array.reshape((array.shape[0], self.h * self.w)).T
+
+    def _resize_grid(self, grid, new_w, new_h, dx, dy):
+        if not self.use_arrays:
+            return super(AtmosphereLayer, self)._resize_grid(grid, new_w, new_h, dx, dy)
+        return AtmosphereGrid(np.array([shift_array(resize_array(channel, new_w, new_h), dx=dx, dy=dy) for channel in grid.channels]))
+
+    @property
+    def halo(self):
+        # points move by no more than MAX_WIND_SPEED (while wind speeds are in [-1, 1]), affect area with DELTA radius
+        # and int() can shift affected cell by one more
+        return self.DELTA + int(math.ceil(self.MAX_WIND_SPEED)) + 1
 
     @classmethod
     def deserialize(cls, world, data):
-        for row in data['data']:
-            row[:] = [AtmospherePoint(wind=tuple(e[0]), temperature=e[1], wetness=e[2]) for e in row]
+        # channels arrays of snapshot are loaded as is
+        if isinstance(data['data'], list):
+            for row in data['data']:
+                row[:] = [AtmospherePoint(wind=tuple(e[0]), temperature=e[1], wetness=e[2]) for e in row]
+
+        # atmosphere powers are not used between steps, so they are always restored with default values
+        return cls(world=world, data=data['data'])
+
+    def _advect(self):
+        '''
+        vectorized version of points moving & approximation (arrays storage only)
+
+        every point is scattered to area around its next position with weights 1/distance,
+        weighted sums are accumulated with bincount for every area delta separately;
+        for cells, that have points with zero distance, first of that points is used (as in prepair_to_approximation)
+        '''
+        cells_number = self.w * self.h
+
+        values = [channel.ravel() for channel in self.data.channels]
+
+        ys, xs = np.divmod(np.arange(cells_number), self.w)
+
+        # positions are calculated in coordinates of whole world, since rounding depends on them
+        next_x = xs + self.origin_x + values[0]*self.MAX_WIND_SPEED
+        next_y = ys + self.origin_y + values[1]*self.MAX_WIND_SPEED
+
+        weights_sums = np.zeros(cells_number)
+        values_sums = [np.zeros(cells_number) for value in values]
+
+        hits_targets = []
+        hits_orders = []
+
+        for delta_index, (dx, dy) in enumerate(self.area_deltas):
+            affected_x = (next_x+dx).astype(int)
+            affected_y = (next_y+dy).astype(int)
 
-        power = data.get('power')
+            inside = np.flatnonzero((self.origin_x <= affected_x) & (affected_x < self.origin_x + self.w) &
+                                    (self.origin_y <= affected_y) & (affected_y < self.origin_y + self.h))
 
-        return cls(world=world, data=data['data'], power=power)
+            distances = np.hypot(next_x[inside]-affected_x[inside], next_y[inside]-affected_y[inside])
+            targets = (affected_y[inside] - self.origin_y) * self.w + affected_x[inside] - self.origin_x
+
+            hits = distances < E
+            if hits.any():
+                hits_targets.append(targets[hits])
+                hits_orders.append(inside[hits] * len(self.area_deltas) + delta_index)
+                distances[hits] = np.inf
+
+            weights = 1.0 / distances
+            weights_sums += np.bincount(targets, weights=weights, minlength=cells_number)
+
+            for value, value_sums in zip(values, values_sums):
+                value_sums += np.bincount(targets, weights=weights*value[inside], minlength=cells_number)
+
+        results = [value_sums / np.where(weights_sums > 0, weights_sums, 1.0) for value_sums in values_sums]
+
+        if hits_targets:
+            hits_targets = np.concatenate(hits_targets)
+            hits_orders = np.concatenate(hits_orders)
+
+            order = np.lexsort((hits_orders, hits_targets))
+            targets, first_indexes = np.unique(hits_targets[order], return_index=True)
+            sources = hits_orders[order][first_indexes] // len(self.area_deltas)
+
+            for value, result in zip(values, results):
+                result[targets] = value[sources]
+
+        return AtmosphereGrid(np.array(results).reshape((AtmosphereGrid.CHANNELS_NUMBER, self.h, self.w)))
 
     def sync(self):
 
+        if self.use_arrays:
+            point = self._advect()
+
+            wind_multiplier = np.where(self.world.layer_vegetation.data == VEGETATION_TYPE.FOREST, self.WIND_FOREST_MULTIPLIER, 1.0)
+
+            wind = self.world.layer_wind.data
+
+            self.next_data.wind_x[...] = (point.wind_x*self.WIND_AK+wind[:, :, 0]*self.WIND_WK) * wind_multiplier
+            self.next_data.wind_y[...] = (point.wind_y*self.WIND_AK+wind[:, :, 1]*self.WIND_WK) * wind_multiplier
+            self.next_data.temperature[...] = point.temperature*self.TEMP_AK+self.world.layer_temperature.data*self.TEMP_WK
+            self.next_data.wetness[...] = point.wetness*self.WET_AK+self.world.layer_wetness.data*self.WET_WK
+            return
+
+        powers = []
         for y in xrange(0, self.h):
-            for x in xrange(0, self.w):
-                self.power[y][x] = []
+            powers.append([[] for x in xrange(0, self.w)])
 
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
@@ -83,13 +319,13 @@ class AtmosphereLayer(BaseLayer):
                         continue
 
                     dist = math.hypot(next_x-affected_x, next_y-affected_y)
-                    self.power[affected_y][affected_x].append((dist, point))
+                    powers[affected_y][affected_x].append((dist, point))
 
 
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
-                powers = prepair_to_approximation(self.power[y][x], default=self.DEFAULT)
-                point = reduce(points_reduces, powers, self.DEFAULT)
+                points = prepair_to_approximation(powers[y][x], default=self.DEFAULT)
+                point = reduce(points_reduces, points, self.DEFAULT)
 
                 wind_multiplier = 1.0
 
@@ -1,47 +1,193 @@
 # coding: utf-8
 
-from deworld.utils import copy2d, resize2d, shift2d
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.utils import copy2d, resize2d, shift2d, resize_array, shift_array
 from deworld.exceptions import DeworldException
 
 
+class STORAGE_TYPE:
+    LISTS = 0
+    ARRAYS = 1
+
+
+class LAYER_TYPE:
+    HEIGHT = 0
+    TEMPERATURE = 1
+    WIND = 2
+    WETNESS = 3
+    VEGETATION = 4
+    ATMOSPHERE = 5
+    SOIL = 6
+
+
 class BaseLayer(object):
 
+    TYPE = None
+
+    # types of other layers, which data is read by sync
+    # (sync reads only current data of layers and writes only its own next_data & power)
+    READS = ()
+
+    # can sync be done for part of world (extended by halo cells) independently from other parts
+    TILEABLE = True
+
+    GRIDS = ('data', 'next_data', 'power', 'base_power')
+
+    # grids, which are saved to snapshots (power only if requested)
+    SNAPSHOT_GRIDS = ('data', 'power')
+
+    DATA_DTYPE = float
+    POWER_DTYPE = float
+
     def __init__(self, world, default=0.0, default_power=None, data=None, power=None):
 
         if default_power is None:
             default_power = default
 
         self.world = world
+        self.default_power = default_power
+
+        # coordinates of layer in whole world (not zero, when layer is synced as a part of world)
+        self.origin_x = 0
+        self.origin_y = 0
+
+        self.storage = getattr(self.config, 'STORAGE', STORAGE_TYPE.LISTS)
+
+        if self.storage == STORAGE_TYPE.ARRAYS and np is None:
+            raise DeworldException('numpy MUST be installed to use arrays storage for layer %r' % self.__class__)
+
+        self.next_data = self._create_grid(default, self.DATA_DTYPE)
+
+        self.data = self._copy_grid(self.next_data) if data is None else self._load_grid(data, self.DATA_DTYPE)
+
+        self.base_power = self._create_grid(default_power, self.POWER_DTYPE)
+
+        self.power = self._copy_grid(self.base_power) if power is None else self._load_grid(power, self.POWER_DTYPE)
+
+    @property
+    def use_arrays(self): return self.storage == STORAGE_TYPE.ARRAYS
+
+    def _create_grid(self, value, dtype):
+        if not self.use_arrays:
+            grid = []
+            for y in xrange(0, self.h):
+                grid.append([value] * self.w)
+            return grid
 
-        self.next_data = []
-        for y in xrange(0, self.h):
-            self.next_data.append([default] * self.w)
+        value = np.array(value, dtype=dtype)
+        grid = np.empty((self.h, self.w) + value.shape, dtype=dtype)
+        grid[...] = value
+        return grid
 
-        self.data = copy2d(self.next_data) if data is None else data
+    def _load_grid(self, data, dtype):
+        if np is not None and isinstance(data, np.ndarray):
+            # arrays (e.g. memmaps of snapshot) are used without copying
+            return self._grid_from_array(data)
+        if not self.use_arrays:
+            return data
+        return np.array(data, dtype=dtype)
 
-        self.base_power = []
-        for y in xrange(0, self.h):
-            self.base_power.append([default_power] * self.w)
+    def _copy_grid(self, grid):
+        if not self.use_arrays:
+            return copy2d(grid)
+        return grid.copy()
 
-        self.power = copy2d(self.base_power) if power is None else power
+    def _copy_grid_into(self, grid, target):
+        np.copyto(target, grid)
+
+    def _grids_equal(self, grid_1, grid_2):
+        return np.array_equal(grid_1, grid_2)
+
+    def _map_grid(self, grid, function):
+        return function(grid)
+
+    def _crop_grid(self, grid, x, y, w, h):
+        return grid[y:y+h, x:x+w]
+
+    def snapshot_grids(self, powers=False):
+        return [grid_name for grid_name in self.SNAPSHOT_GRIDS if powers or grid_name != 'power']
+
+    def _grid_to_array(self, grid, dtype):
+        return np.asarray(grid, dtype=dtype)
+
+    def _grid_from_array(self, array):
+        if self.use_arrays:
+            return array
+        if array.ndim > 2:
+            return [[tuple(cell) for cell in row] for row in array.tolist()]
+        return array.tolist()
+
+    def _cells_array(self, array):
+        '''
+        view of grid array (see _grid_to_array) with cells along first axis and values of cells along second one
+        '''
+        return array.reshape((self.h * self.w, -1))
+
+    def _dump_row(self, grid, y):
+        if not self.use_arrays:
+            return grid[y]
+        return grid[y].tolist()
+
+    def _load_row(self, grid, y, row):
+        if self.use_arrays:
+            grid[y] = row
+        else:
+            grid[y] = [tuple(cell) if isinstance(cell, list) else cell for cell in row]
+
+    def _dump_grid(self, grid):
+        if not self.use_arrays:
+            return grid
+        return grid.tolist()
+
+    def _resize_grid(self, grid, new_w, new_h, dx, dy):
+        if not self.use_arrays:
+            return shift2d(resize2d(grid, new_w, new_h), dx=dx, dy=dy)
+        return shift_array(resize_array(grid, new_w, new_h), dx=dx, dy=dy)
 
     def resize(self, new_w, new_h, dx, dy):
-        self.next_data = shift2d(resize2d(self.next_data, new_w, new_h), dx=dx, dy=dy)
-        self.data = shift2d(resize2d(self.data, new_w, new_h), dx=dx, dy=dy)
-        self.base_power = shift2d(resize2d(self.base_power, new_w, new_h), dx=dx, dy=dy)
-        self.power = shift2d(resize2d(self.power, new_w, new_h), dx=dx, dy=dy)
+        self.next_data = self._resize_grid(self.next_data, new_w, new_h, dx, dy)
+        self.data = self._resize_grid(self.data, new_w, new_h, dx, dy)
+        self.base_power = self._resize_grid(self.base_power, new_w, new_h, dx, dy)
+        self.power = self._resize_grid(self.power, new_w, new_h, dx, dy)
 
-    def serialize(self):
-        return {'data': self.data,
-                'power': self.power}
+    def serialize(self, powers=True):
+        '''
+        powers are recalculated every step, so they are not needed to continue world steps and can be skipped with powers=False
+        '''
+        data = {'data': self._dump_grid(self.data)}
+
+        if powers:
+            data['power'] = self._dump_grid(self.power)
+
+        return data
 
     @classmethod
     def deserialize(cls, world, data):
         raise DeworldException('deserialize method not implemented for layer %r' % cls)
 
     def __eq__(self, other):
-        return ( self.__class__ is other.__class__ and
-                 self.data == other.data )
+        if self.__class__ is not other.__class__:
+            return False
+
+        if other.use_arrays and not self.use_arrays:
+            return other == self
+
+        if self.use_arrays:
+            other_data = other.data if other.use_arrays else self._load_grid(other.data, self.DATA_DTYPE)
+            return self._grids_equal(self.data, other_data)
+
+        return self.data == other.data
+
+    @property
+    def halo(self):
+        '''
+        radius of neighbourhood of cell, which data is used by sync
+        '''
+        return 0
 
     @property
     def w(self): return self.world.w
@@ -61,20 +207,53 @@ class BaseLayer(object):
         self.power[y][x] += power
 
     def apply_powers(self, x, y, powers):
+        if len(powers) == 0:
+            return
+
+        # intersection of powers rect with world
+        x_from, x_to = max(x, 0), min(x+len(powers[0]), self.w)
+        y_from, y_to = max(y, 0), min(y+len(powers), self.h)
 
-        for i, row in enumerate(powers):
-            if y+i < 0 or self.h <= y+i : continue
+        if x_from >= x_to or y_from >= y_to:
+            return
 
-            for j, power in enumerate(row):
-                if x+j < 0 or self.w <= x+j : continue
+        if self.use_arrays:
+            powers = np.asarray(powers, dtype=self.POWER_DTYPE)
+            self.power[y_from:y_to, x_from:x_to] += powers[y_from-y:y_to-y, x_from-x:x_to-x]
+            return
 
-                self.add_power(x+j, y+i, power)
+        for power_y in xrange(y_from, y_to):
+            row = powers[power_y-y]
+            for power_x in xrange(x_from, x_to):
+                self.add_power(power_x, power_y, row[power_x-x])
 
     def reset_powers(self):
-        self.power = copy2d(self.base_power)
+        if self.use_arrays:
+            self._copy_grid_into(self.base_power, self.power)
+        else:
+            for row, base_row in zip(self.power, self.base_power):
+                row[:] = base_row
+
+    def clear_powers(self):
+        if self.use_arrays:
+            self._copy_grid_into(self._create_grid(self.default_power, self.POWER_DTYPE), self.power)
+        else:
+            for row in self.power:
+                row[:] = [self.default_power] * self.w
+
+    def fix_powers(self):
+        '''
+        use current powers as base powers of next steps
+        '''
+        if self.use_arrays:
+            self._copy_grid_into(self.power, self.base_power)
+        else:
+            for base_row, row in zip(self.base_power, self.power):
+                base_row[:] = row
 
     def sync(self):
         pass
 
     def apply(self):
-        self.data = copy2d(self.next_data)
+        # sync rewrites every cell of next_data, so buffers are swapped instead of copying
+        self.data, self.next_data = self.next_data, self.data
@@ -1,9 +1,17 @@
 # coding: utf-8
 
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
 
 class HeightLayer(BaseLayer):
 
+    TYPE = LAYER_TYPE.HEIGHT
+    READS = ()
+
     MIN = -1.0
     MAX = 1.0
     E = 0.01
@@ -15,9 +23,6 @@ class HeightLayer(BaseLayer):
         super(HeightLayer, self).__init__(default=(self.MAX + self.MIN) / 2, default_power=(0.0, 0.0), **kwargs)
         self._merge_config(self.config.LAYERS.HEIGHT)
 
-    def serialize(self):
-        return super(HeightLayer, self).serialize()
-
     @classmethod
     def deserialize(cls, world, data):
         return cls(world=world, data=data['data'], power=data.get('power'))
@@ -26,8 +31,20 @@ class HeightLayer(BaseLayer):
         old_power = self.power[y][x]
         self.power[y][x] = (old_power[0] + power[0], old_power[1] + power[1])
 
+    def _sync_arrays(self):
+        rising = self.power[:, :, 1] - self.power[:, :, 0] > self.E
+        falling = self.power[:, :, 0] - self.power[:, :, 1] > self.E
+
+        self.next_data[...] = np.where(rising,
+                                       np.minimum(self.data + self.STEP, self.MAX),
+                                       np.where(falling, np.maximum(self.data - self.STEP, self.MIN), self.data))
+
     def sync(self):
 
+        if self.use_arrays:
+            self._sync_arrays()
+            return
+
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
                 original_value = self.data[y][x]
@@ -1,12 +1,20 @@
 # coding: utf-8
 import math
 
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
 
 from deworld.layers.vegetation_layer import VEGETATION_TYPE
 
 class SoilLayer(BaseLayer):
 
+    TYPE = LAYER_TYPE.SOIL
+    READS = (LAYER_TYPE.TEMPERATURE, LAYER_TYPE.WETNESS, LAYER_TYPE.VEGETATION, LAYER_TYPE.WIND)
+
     MIN = 0
     MAX = 1.0
 
@@ -28,14 +36,49 @@ class SoilLayer(BaseLayer):
         super(SoilLayer, self).__init__(default=(self.MAX+self.MIN)/2, default_power=0.0, **kwargs)
         self._merge_config(self.config.LAYERS.SOIL)
 
-    def serialize(self):
-        return super(SoilLayer, self).serialize()
-
     @classmethod
     def deserialize(cls, world, data):
         return cls(world=world, data=data['data'], power=data.get('power'))
 
+    def _vegetation_powers(self):
+        return {VEGETATION_TYPE.DESERT: self.POWER_PER_VEGETATION_DESERT,
+                VEGETATION_TYPE.GRASS: self.POWER_PER_VEGETATION_GRASS,
+                VEGETATION_TYPE.FOREST: self.POWER_PER_VEGETATION_FOREST}
+
+    def _sync_arrays(self):
+        power_points = self.power + np.fabs(self.OPTIMAL_TEMPERATURE - self.world.layer_temperature.data) * self.POWER_PER_TEMPERATURE
+        power_points += np.fabs(self.OPTIMAL_WETNESS - self.world.layer_wetness.data) * self.POWER_PER_WETNESS
+
+        vegetation = self.world.layer_vegetation.data
+
+        wind = self.world.layer_wind.data
+        wind_speed = np.hypot(wind[:, :, 0], wind[:, :, 1])
+
+        windy = (vegetation != VEGETATION_TYPE.FOREST) & (wind_speed > self.OPTIMAL_WIND)
+        power_points = np.where(windy, power_points + np.fabs(self.OPTIMAL_WIND - wind_speed) * self.POWER_PER_WIND, power_points)
+
+        vegetation_powers = self._vegetation_powers()
+        vegetation_powers_table = np.zeros(max(vegetation_powers.keys())+1)
+        vegetation_powers_table[vegetation_powers.keys()] = vegetation_powers.values()
+
+        power_points += np.take(vegetation_powers_table, vegetation)
+
+        soil = self.data
+
+        self.next_data[...] = np.where(power_points > soil,
+                                       np.minimum(self.MAX, soil + self.STEP),
+                                       np.where(power_points < soil, np.maximum(self.MIN, soil - self.STEP), soil))
+
+        self.power[...] = power_points
+
     def sync(self):
+
+        if self.use_arrays:
+            self._sync_arrays()
+            return
+
+        vegetation_powers = self._vegetation_powers()
+
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
                 power_points = self.power[y][x]
@@ -50,9 +93,7 @@ class SoilLayer(BaseLayer):
                     if wind_speed > self.OPTIMAL_WIND:
                         power_points += math.fabs(self.OPTIMAL_WIND - wind_speed) * self.POWER_PER_WIND
 
-                power_points += {VEGETATION_TYPE.DESERT: self.POWER_PER_VEGETATION_DESERT,
-                                 VEGETATION_TYPE.GRASS: self.POWER_PER_VEGETATION_GRASS,
-                                 VEGETATION_TYPE.FOREST: self.POWER_PER_VEGETATION_FOREST}[vegetation]
+                power_points += vegetation_powers[vegetation]
 
                 soil = self.data[y][x]
 
@@ -1,11 +1,19 @@
 # coding: utf-8
 import math
 
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
 
 
 class TemperatureLayer(BaseLayer):
 
+    TYPE = LAYER_TYPE.TEMPERATURE
+    READS = (LAYER_TYPE.HEIGHT, LAYER_TYPE.ATMOSPHERE)
+
     MIN = 0
     MAX = 1.0
 
@@ -17,15 +25,25 @@ class TemperatureLayer(BaseLayer):
         super(TemperatureLayer, self).__init__(default=(self.MAX+self.MIN)/2, default_power=0.0, **kwargs)
         self._merge_config(self.config.LAYERS.TEMPERATURE)
 
-    def serialize(self):
-        return super(TemperatureLayer, self).serialize()
-
     @classmethod
     def deserialize(cls, world, data):
         return cls(world=world, data=data['data'], power=data.get('power'))
 
+    def _sync_arrays(self):
+        power_points = np.minimum(self.MAX, np.maximum(self.MIN, self.power))
+
+        temperature = power_points - (np.fabs(self.world.layer_height.data) * self.HEIGHT_PENALTY)
+
+        self.next_data[...] = temperature * self.POWER_WK + self.world.layer_atmosphere.data.temperature * self.POWER_AK
+
+        self.power[...] = power_points
+
     def sync(self):
 
+        if self.use_arrays:
+            self._sync_arrays()
+            return
+
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
                 power_points = self.power[y][x]
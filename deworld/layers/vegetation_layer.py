@@ -1,7 +1,12 @@
 # coding: utf-8
-import random
 
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.utils import box_sum, counter_random_state, counter_random_from, counter_random_array_from
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
 
 
 class VEGETATION_TYPE:
@@ -11,9 +16,21 @@ class VEGETATION_TYPE:
     FOREST = 2
 
 
+class RANDOM_STREAM:
+
+    GRASS_BONUS = 0
+    FOREST_BONUS = 1
+    GRASS_SPAWN = 2
+    FOREST_SPAWN = 3
+
 
 class VegetationLayer(BaseLayer):
 
+    TYPE = LAYER_TYPE.VEGETATION
+    READS = (LAYER_TYPE.HEIGHT, LAYER_TYPE.TEMPERATURE, LAYER_TYPE.WETNESS)
+
+    DATA_DTYPE = int
+
     MIN = 0.0
     MAX = 1.0
 
@@ -45,8 +62,15 @@ class VegetationLayer(BaseLayer):
         super(VegetationLayer, self).__init__(default=VEGETATION_TYPE.DESERT, default_power=(0.0, 0.0), **kwargs)
         self._merge_config(self.config.LAYERS.VEGETATION)
 
-    def serialize(self):
-        return super(VegetationLayer, self).serialize()
+        # hash states of prefixes of random keys of cells for turn of world, see _random_state
+        self._random_states_turn = None
+        self._random_states = {}
+
+        # random numbers of all cells for every stream, they are calculated at once by lists sync, if numpy is installed
+        self._random_grids = None
+
+    @property
+    def halo(self): return 1
 
     @classmethod
     def deserialize(cls, world, data):
@@ -75,30 +99,145 @@ class VegetationLayer(BaseLayer):
 
         return power
 
+    def _random_state(self, stream):
+        '''
+        prefix (seed, turn, TYPE, stream) of random keys is the same for all cells, so it is hashed once per turn
+        '''
+        if self._random_states_turn != self.world.turn:
+            self._random_states_turn = self.world.turn
+            self._random_states = {}
+
+        if stream not in self._random_states:
+            self._random_states[stream] = counter_random_state((self.world.seed, self.world.turn, self.TYPE, stream))
+
+        return self._random_states[stream]
+
+    def _random(self, x, y, stream):
+        '''
+        random number of cell for current turn of world, coordinates of cell are mixed as single key
+        '''
+        if self._random_grids is not None:
+            return self._random_grids[stream][y][x]
+
+        return counter_random_from(self._random_state(stream), ((self.origin_y+y) << 32) + self.origin_x+x)
+
+    def _random_array(self, stream):
+        ys, xs = np.indices((self.h, self.w))
+        return counter_random_array_from(self._random_state(stream), ((self.origin_y+ys) << 32) + self.origin_x+xs)
+
     def can_spawn(self, x, y, type_):
-        for y in xrange(y-1, y+1+1):
-            for x in xrange(x-1, x+1+1):
-                if not (0 <= y < self.h and 0 <= x < self.w):
+        stream = RANDOM_STREAM.GRASS_SPAWN if VEGETATION_TYPE.GRASS in type_ else RANDOM_STREAM.FOREST_SPAWN
+
+        for _y in xrange(y-1, y+1+1):
+            for _x in xrange(x-1, x+1+1):
+                if not (0 <= _y < self.h and 0 <= _x < self.w):
                     continue
-                if self.data[y][x] in type_:
+                if self.data[_y][_x] in type_:
                     return True
 
-        return random.uniform(0, 1) < self.SPAWN_PROBABILITY
+        return self._random(x, y, stream) < self.SPAWN_PROBABILITY
 
     def power_from_current_situation(self, x, y):
         grass, forest = 0.0, 0.0
-        for y in xrange(y-1, y+1+1):
-            for x in xrange(x-1, x+1+1):
-                if not (0 <= y < self.h and 0 <= x < self.w):
+        for _y in xrange(y-1, y+1+1):
+            for _x in xrange(x-1, x+1+1):
+                if not (0 <= _y < self.h and 0 <= _x < self.w):
                     continue
-                if self.data[y][x] == VEGETATION_TYPE.GRASS: grass += self.CURRENT_GRASS_POWER_BONUS
-                elif self.data[y][x] == VEGETATION_TYPE.FOREST: forest += self.CURRENT_FOREST_POWER_BONUS
+                if self.data[_y][_x] == VEGETATION_TYPE.GRASS: grass += self.CURRENT_GRASS_POWER_BONUS
+                elif self.data[_y][_x] == VEGETATION_TYPE.FOREST: forest += self.CURRENT_FOREST_POWER_BONUS
+
+        # random numbers are not taken for zero bonuses (result is the same)
+        if grass:
+            grass *= self._random(x, y, RANDOM_STREAM.GRASS_BONUS)
+
+        if forest:
+            forest *= self._random(x, y, RANDOM_STREAM.FOREST_BONUS)
+
+        return grass, forest
+
+    def _border_right_powers(self, power, value, border_start, border_end):
+        '''
+        vectorized version of _border_right_power
+        '''
+        return np.where(value > border_start,
+                        np.where(value > border_end, 0.0, power * (1 - (value - border_start) / float(border_end - border_start))),
+                        power)
 
-        return random.uniform(0, grass), random.uniform(0, forest)
+    def _border_left_powers(self, power, value, border_start, border_end):
+        '''
+        vectorized version of _border_left_power
+        '''
+        return np.where(value < border_start,
+                        np.where(value < border_end, 0.0, power * (1 - (border_start - value) / float(border_start - border_end))),
+                        power)
+
+    def _neighbours_bonuses(self, type_, bonus):
+        '''
+        bonus for every neighbour cell with vegetation of type_, summed in the same order as in power_from_current_situation
+        '''
+        bonuses = [0.0]
+        for i in xrange(9):
+            bonuses.append(bonuses[-1] + bonus)
+
+        counts = box_sum((self.data == type_).astype(int), 1)
+
+        return np.take(bonuses, counts), counts
+
+    def _sync_arrays(self):
+        power_grass = self.power[:, :, 0]
+        power_forest = self.power[:, :, 1]
+
+        desert = self.data == VEGETATION_TYPE.DESERT
+        power_grass = np.where(desert, np.maximum(power_grass, power_forest), power_grass)
+        power_forest = np.where(desert, np.maximum(power_grass, power_forest), power_forest)
+
+        height = self.world.layer_height.data
+        power_forest = self._border_right_powers(power_forest, height, self.HEIGHT_FOREST_BARIER_START, self.HEIGHT_FOREST_BARIER_END)
+        power_grass = self._border_right_powers(power_grass, height, self.HEIGHT_GRASS_BARIER_START, self.HEIGHT_GRASS_BARIER_END)
+
+        temperature = self.world.layer_temperature.data
+        power_forest = self._border_right_powers(power_forest, temperature, self.TEMPERATURE_FOREST_BARIER_START, self.TEMPERATURE_FOREST_BARIER_END)
+        power_grass = self._border_right_powers(power_grass, temperature, self.TEMPERATURE_GRASS_BARIER_START, self.TEMPERATURE_GRASS_BARIER_END)
+
+        wetness = self.world.layer_wetness.data
+        power_forest = self._border_left_powers(power_forest, wetness, self.WETNESS_FOREST_BARIER_START, self.WETNESS_FOREST_BARIER_END)
+        power_grass = self._border_left_powers(power_grass, wetness, self.WETNESS_GRASS_BARIER_START, self.WETNESS_GRASS_BARIER_END)
+
+        grass_bonuses, grass_neighbours = self._neighbours_bonuses(VEGETATION_TYPE.GRASS, self.CURRENT_GRASS_POWER_BONUS)
+        forest_bonuses, forest_neighbours = self._neighbours_bonuses(VEGETATION_TYPE.FOREST, self.CURRENT_FOREST_POWER_BONUS)
+
+        power_grass = power_grass + grass_bonuses * self._random_array(RANDOM_STREAM.GRASS_BONUS)
+        power_forest = power_forest + forest_bonuses * self._random_array(RANDOM_STREAM.FOREST_BONUS)
+
+        can_spawn_forest = (forest_neighbours > 0) | (self._random_array(RANDOM_STREAM.FOREST_SPAWN) < self.SPAWN_PROBABILITY)
+        can_spawn_grass = (grass_neighbours + forest_neighbours > 0) | (self._random_array(RANDOM_STREAM.GRASS_SPAWN) < self.SPAWN_PROBABILITY)
+
+        forest = (power_forest > power_grass) & (power_forest > self.FOREST_BORDER) & can_spawn_forest
+        grass = (power_grass > self.GRASS_BORDER) & can_spawn_grass
+
+        self.next_data[...] = np.where(forest, VEGETATION_TYPE.FOREST, np.where(grass, VEGETATION_TYPE.GRASS, VEGETATION_TYPE.DESERT))
+
+        self.power[:, :, 0] = power_grass
+        self.power[:, :, 1] = power_forest
 
 
     def sync(self):
 
+        if self.use_arrays:
+            self._sync_arrays()
+            return
+
+        if np is not None:
+            self._random_grids = dict((stream, self._random_array(stream).tolist())
+                                      for stream in (RANDOM_STREAM.GRASS_BONUS, RANDOM_STREAM.FOREST_BONUS,
+                                                     RANDOM_STREAM.GRASS_SPAWN, RANDOM_STREAM.FOREST_SPAWN))
+
+        try:
+            self._sync_lists()
+        finally:
+            self._random_grids = None
+
+    def _sync_lists(self):
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
                 power_points = self.power[y][x]
@@ -1,10 +1,18 @@
 # coding: utf-8
 
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
 
 
 class WetnessLayer(BaseLayer):
 
+    TYPE = LAYER_TYPE.WETNESS
+    READS = (LAYER_TYPE.HEIGHT, LAYER_TYPE.TEMPERATURE, LAYER_TYPE.ATMOSPHERE)
+
     MIN = 0.0
     MAX = 1.0
 
@@ -17,15 +25,29 @@ class WetnessLayer(BaseLayer):
         super(WetnessLayer, self).__init__(default=0.0, **kwargs)
         self._merge_config(self.config.LAYERS.WETNESS)
 
-    def serialize(self):
-        return super(WetnessLayer, self).serialize()
-
     @classmethod
     def deserialize(cls, world, data):
         return cls(world=world, data=data['data'], power=data.get('power'))
 
+    def _sync_arrays(self):
+        original_value = self.data
+
+        power_points = self.power + self.world.layer_height.data * self.POWER_PER_HEIGHT
+        power_points += self.world.layer_temperature.data * self.POWER_PER_TEMPERATURE
+        power_points += (self.world.layer_atmosphere.data.wetness - original_value) * self.POWER_PER_ATMOSPHERE
+
+        self.next_data[...] = np.where(power_points > original_value,
+                                       np.minimum(original_value + self.STEP, self.MAX),
+                                       np.where(power_points < original_value, np.maximum(original_value - self.STEP, self.MIN), original_value))
+
+        self.power[...] = power_points
+
     def sync(self):
 
+        if self.use_arrays:
+            self._sync_arrays()
+            return
+
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
                 original_value = self.data[y][x]
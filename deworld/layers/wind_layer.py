@@ -2,13 +2,21 @@
 
 import math
 
-from deworld.layers.base_layer import BaseLayer
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-from deworld.utils import E
+from deworld.layers.base_layer import BaseLayer, LAYER_TYPE
+
+from deworld.utils import E, box_sum
 
 
 class WindLayer(BaseLayer):
 
+    TYPE = LAYER_TYPE.WIND
+    READS = (LAYER_TYPE.TEMPERATURE, LAYER_TYPE.HEIGHT)
+
     MIN = -1.0
     MAX = 1.0
 
@@ -20,9 +28,13 @@ class WindLayer(BaseLayer):
     def __init__(self, **kwargs):
         super(WindLayer, self).__init__(default=(0.0, 0.0), **kwargs)
         self._merge_config(self.config.LAYERS.WIND)
+        self._kernel = None
+        self._kernel_delta = None
+        self._border_winds = None
+        self._border_winds_key = None
 
-    def serialize(self):
-        return super(WindLayer, self).serialize()
+    @property
+    def halo(self): return self.DELTA
 
     @classmethod
     def deserialize(cls, world, data):
@@ -74,6 +86,58 @@ class WindLayer(BaseLayer):
 
         return v_speed, h_speed
 
+    def _get_kernel(self):
+        '''
+        offsets of cells, that affect wind, with cos & sin of direction to affected cell and distance to it
+        (for every cell they are the same, so calculate them once)
+        '''
+        if self._kernel_delta != self.DELTA:
+            self._kernel = []
+            for dy in xrange(-self.DELTA, self.DELTA+1):
+                for dx in xrange(-self.DELTA, self.DELTA+1):
+                    angle = math.atan2(-dy, -dx)
+                    distance = 1
+                    if dx != 0 or dy != 0:
+                        distance = math.hypot(dx, dy)
+                    self._kernel.append((dx, dy, math.cos(angle), math.sin(angle), distance))
+            self._kernel_delta = self.DELTA
+
+        return self._kernel
+
+    def _calculate_winds(self):
+        '''
+        vectorized version of _calculate_wind for all cells (arrays storage only)
+        every kernel offset is processed as shifted arrays in the same order as in _calculate_wind
+        '''
+        delta = self.DELTA
+
+        temperature = self.world.layer_temperature.data
+        height = self.world.layer_height.data
+
+        padded_temperature = np.pad(temperature, delta, mode='edge')
+        padded_height = np.pad(height, delta, mode='edge')
+        padded_inside = np.pad(np.ones((self.h, self.w), dtype=bool), delta, mode='constant', constant_values=False)
+
+        v_speed = np.zeros((self.h, self.w))
+        h_speed = np.zeros((self.h, self.w))
+
+        for dx, dy, cos, sin, distance in self._get_kernel():
+            window = (slice(delta+dy, delta+dy+self.h), slice(delta+dx, delta+dx+self.w))
+
+            temp_multiplier = self.TEMPERATURE_SPEED * (temperature - padded_temperature[window])
+            height_multiplier = self.HEIGHT_SPEED * (padded_height[window] - height)
+
+            inside = padded_inside[window]
+
+            v_speed += np.where(inside, (cos*temp_multiplier + cos*height_multiplier) / distance, cos*self.BORDER_SPEED)
+            h_speed += np.where(inside, (sin*temp_multiplier + sin*height_multiplier) / distance, sin*self.BORDER_SPEED)
+
+        winds = np.empty((self.h, self.w, 2))
+        winds[:, :, 0] = np.clip(v_speed, self.MIN, self.MAX)
+        winds[:, :, 1] = np.clip(h_speed, self.MIN, self.MAX)
+
+        return winds
+
     def _smooth_wind(self, x, y):
 
         v_speed, h_speed = self.next_data[y][x]
@@ -106,8 +170,63 @@ class WindLayer(BaseLayer):
         return v_speed, h_speed
 
 
+    def _is_calm(self, winds):
+        return (-E < winds[..., 0]) & (winds[..., 0] < E) & (-E < winds[..., 1]) & (winds[..., 1] < E)
+
+    def _get_border_winds(self):
+        '''
+        sums and numbers of not calm border winds around every cell, that used by _smooth_wind
+        (they depend only from world size, so calculated once)
+        '''
+        key = (self.w, self.h, self.DELTA, self.BORDER_SPEED)
+
+        if self._border_winds_key != key:
+            delta = self.DELTA
+            padded_inside = np.pad(np.ones((self.h, self.w), dtype=bool), delta, mode='constant', constant_values=False)
+
+            sums = np.zeros((self.h, self.w, 2))
+            counts = np.zeros((self.h, self.w))
+
+            for dx, dy, cos, sin, distance in self._get_kernel():
+                speed = np.array(self._break_speed(math.atan2(-dy, -dx), self.BORDER_SPEED))
+
+                if self._is_calm(speed):
+                    continue
+
+                outside = ~padded_inside[delta+dy:delta+dy+self.h, delta+dx:delta+dx+self.w]
+                sums[outside] += speed
+                counts[outside] += 1
+
+            self._border_winds = (sums, counts)
+            self._border_winds_key = key
+
+        return self._border_winds
+
+    def _smooth_winds(self):
+        '''
+        vectorized version of _smooth_wind for all cells (arrays storage only)
+        means of not calm winds are calculated with box filters over masked winds
+        '''
+        border_sums, border_counts = self._get_border_winds()
+
+        not_calm = ~self._is_calm(self.data)
+
+        sums = box_sum(self.data * not_calm[..., np.newaxis], self.DELTA) + border_sums
+        counts = box_sum(not_calm.astype(float), self.DELTA) + border_counts
+
+        smoothed = np.where(counts[..., np.newaxis] > 0,
+                            sums / np.maximum(counts, 1)[..., np.newaxis],
+                            0.0)
+
+        return np.where(self._is_calm(self.next_data)[..., np.newaxis], smoothed, self.next_data)
+
     def sync(self):
 
+        if self.use_arrays:
+            self.next_data[...] = self._calculate_winds()
+            self.next_data[...] = self._smooth_winds()
+            return
+
         for y in xrange(0, self.h):
             for x in xrange(0, self.w):
                 self.next_data[y][x] = self._calculate_wind(x, y)
@@ -8,13 +8,104 @@
 import math
 import collections
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.exceptions import DeworldException
+
+
+# number of colors in lookup tables of color maps
+TABLE_SIZE = 1024
+
+
 class Color(collections.namedtuple('BaseColor', ['red', 'green', 'blue'])):
 
     @property
     def rgb(self): return (self.red, self.green, self.blue)
 
 
-class HeightColorMap(object):
+class ColorTable(object):
+    '''
+    lookup table of colors for values range [min_value, max_value]
+
+    range is splitted into size equal bins, every bin has color of its middle value (calculated by get_color),
+    values out of range get colors of first or last bin
+    '''
+
+    def __init__(self, get_color, min_value, max_value, size=TABLE_SIZE):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.size = size
+
+        self._scale = size / float(max_value - min_value)
+
+        self.colors = [get_color(min_value + (i + 0.5) / self._scale) for i in xrange(size)]
+
+        self.array = None if np is None else np.array([color.rgb for color in self.colors], dtype=np.uint8)
+
+    def index(self, value):
+        return min(self.size-1, max(0, int((value - self.min_value) * self._scale)))
+
+    def indexes(self, values):
+        return np.clip(((np.asarray(values) - self.min_value) * self._scale).astype(int), 0, self.size-1)
+
+    def get_color(self, value):
+        return self.colors[self.index(value)]
+
+    def get_colors(self, values):
+        '''
+        uint8 array of rgb colors with shape values.shape + (3,)
+        '''
+        return self.array[self.indexes(values)]
+
+
+class ColorMap(object):
+    '''
+    color map of values in range [MIN_VALUE, MAX_VALUE], which colors are taken from lookup tables,
+    tables are created on first request (separate table for every discretization mode, if calculate_color uses it)
+    '''
+
+    MIN_VALUE = 0.0
+    MAX_VALUE = 1.0
+
+    # calculate_color depends on discret argument
+    USE_DISCRET = False
+
+    _tables = {}
+
+    @classmethod
+    def calculate_color(cls, value, discret=True):
+        raise DeworldException('calculate_color method not implemented for color map %r' % cls)
+
+    @classmethod
+    def get_table(cls, discret=True):
+        key = (cls, discret) if cls.USE_DISCRET else cls
+
+        if key not in cls._tables:
+            cls._tables[key] = ColorTable(lambda value: cls.calculate_color(value, discret=discret), cls.MIN_VALUE, cls.MAX_VALUE)
+
+        return cls._tables[key]
+
+    @classmethod
+    def get_color(cls, value, discret=True):
+        return cls.get_table(discret).get_color(value)
+
+    @classmethod
+    def get_colors(cls, values, discret=True):
+        '''
+        array version of get_color
+        '''
+        return cls.get_table(discret).get_colors(values)
+
+
+class HeightColorMap(ColorMap):
+
+    MIN_VALUE = -1.0
+    MAX_VALUE = 1.0
+
+    USE_DISCRET = True
 
     HIGH_COLORS = list(reversed([ Color(red=245, green=244, blue=242),
                                   Color(red=224, green=222, blue=216),
@@ -61,7 +152,7 @@ class HeightColorMap(object):
                      blue=(c1.blue+c2.blue)/2)
 
     @classmethod
-    def get_color(cls, height, discret=True):
+    def calculate_color(cls, height, discret=True):
 
         if discret:
             if height >= 0:
@@ -75,15 +166,88 @@ class HeightColorMap(object):
                 return cls._get_color_interpolated(cls.LOW_COLORS, -height)
 
 
-class GrayColorMap(object):
+class GrayColorMap(ColorMap):
 
     @classmethod
-    def get_color(cls, height, discret=True):
+    def calculate_color(cls, height, discret=True):
         return Color(int(255*height), int(255*height), int(255*height))
 
 
+class TemperatureColorMap(ColorMap):
+
+    @classmethod
+    def calculate_color(cls, temp, discret=True):
+        r, g, b = 0.5, 0.5, 0.5
+
+        if temp < 0.5:
+            b += temp
+        else:
+            r += (temp - 0.5)
+
+        return RGBColorMap.get_color(r=r, g=g, b=b)
+
+
+class WetnessColorMap(ColorMap):
+
+    @classmethod
+    def calculate_color(cls, wetness, discret=True):
+        return RGBColorMap.get_color(r=1.0-wetness, g=1.0-wetness, b=1.0)
+
+
+class SoilColorMap(ColorMap):
+
+    @classmethod
+    def calculate_color(cls, soil, discret=True):
+        return RGBColorMap.get_color(r=0.0, g=soil, b=0.0)
+
+
+class WindColorMap(object):
+    '''
+    colors of wind: green channel is used for x component, blue channel for y component, red channel is constant,
+    every component has its own lookup table
+
+    wind is not a scalar value, so ColorMap api (get_color, get_colors) is not supported
+    '''
+
+    MIN_VALUE = -1.0
+    MAX_VALUE = 1.0
+
+    RED = 0.5
+
+    _tables = {}
+
+    @classmethod
+    def get_components_tables(cls):
+        if cls not in cls._tables:
+            cls._tables[cls] = (ColorTable(lambda speed: RGBColorMap.get_color(r=cls.RED, g=0.5 + speed * 0.5, b=0.0), cls.MIN_VALUE, cls.MAX_VALUE),
+                                ColorTable(lambda speed: RGBColorMap.get_color(r=cls.RED, g=0.0, b=0.5 + speed * 0.5), cls.MIN_VALUE, cls.MAX_VALUE))
+
+        return cls._tables[cls]
+
+    @classmethod
+    def get_wind_color(cls, wind, discret=True):
+        x_table, y_table = cls.get_components_tables()
+        x_color = x_table.get_color(wind[0])
+        return Color(red=x_color.red, green=x_color.green, blue=y_table.get_color(wind[1]).blue)
+
+    @classmethod
+    def get_wind_colors(cls, wind, discret=True):
+        x_table, y_table = cls.get_components_tables()
+        colors = x_table.get_colors(wind[..., 0])
+        colors[..., 2] = y_table.array[y_table.indexes(wind[..., 1]), 2]
+        return colors
+
+
 class RGBColorMap(object):
 
     @classmethod
     def get_color(cls, r, g, b, discret=True):
         return Color(int(255*r), int(255*g), int(255*b))
+
+    @classmethod
+    def get_colors(cls, r, g, b, discret=True):
+        '''
+        array version of get_color: r, g, b are arrays (or numbers) of the same shape, result is uint8 array with last axis of size 3
+        '''
+        r, g, b = np.broadcast_arrays(*[np.asarray(channel, dtype=float) for channel in (r, g, b)])
+        return np.clip(np.stack((255*r, 255*g, 255*b), axis=-1), 0, 255).astype(np.uint8)
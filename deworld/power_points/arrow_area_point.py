@@ -24,15 +24,15 @@ class ArrowAreaPoint(BasePoint):
         self.length_normalizer = length_normalizer
         self.width_normalizer = width_normalizer
 
-    def update_powers(self, layer, world):
+    def stamp_key(self, world):
+        return super(ArrowAreaPoint, self).stamp_key(world) + (tuple(self.arrows), self.length_normalizer, self.width_normalizer)
+
+    def _build_stamp(self, world):
         radius = max(arrow.length + arrow.width for arrow in self.arrows)
 
         w = h = 1+radius*2
 
-        if self._powers is None:
-            self._powers = self._get_powers_rect(w=w, h=h)
-
-        powers = self._powers
+        powers = self._get_powers_rect(w=w, h=h)
 
         for arrow in self.arrows:
             arrow_sin = math.sin(arrow.angle)
@@ -77,4 +77,4 @@ class ArrowAreaPoint(BasePoint):
                     power = self.width_normalizer(length_power, point_width/arrow.width)
                     powers[y][x] = max(powers[y][x], power)
 
-        layer.apply_powers(self.x-radius, self.y-radius, powers)
+        return self.x-radius, self.y-radius, powers
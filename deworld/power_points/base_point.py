@@ -1,6 +1,11 @@
 # coding: utf-8
 
-from deworld.layers import LAYER_TYPE
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.layers import LAYER_TYPE, STORAGE_TYPE
 
 from deworld.layers import BaseLayer
 
@@ -8,6 +13,7 @@ class LogLayer(BaseLayer):
 
     def __init__(self, world, x, y):
         self.world = world
+        self.storage = STORAGE_TYPE.LISTS
         self.x = x
         self.y = y
         self.value = None
@@ -19,14 +25,41 @@ class LogLayer(BaseLayer):
 
 class BasePoint(object):
 
-    def __init__(self, layer_type, name, x, y, power, default_power=0.0):
+    def __init__(self, layer_type, name, x, y, power, default_power=0.0, static=None):
         self.layer_type = layer_type
         self.name = name
         self.x = x
         self.y = y
-        self.power = power if callable(power) else lambda world, x, y: power
-        self._powers = None
+        self.power = power
         self.default_power = default_power
+        self._static = static
+        self._stamp = None
+        self._stamp_key = None
+        self._stamp_array = None
+
+    @property
+    def power(self): return self._power
+
+    @power.setter
+    def power(self, power):
+        self._power_value = power
+        self._power = power if callable(power) else lambda world, x, y: power
+
+    @property
+    def static(self):
+        '''
+        static point adds the same powers every step (if it is not moved), so its powers are added to base powers of layer
+        by default point is static if its power is not callable
+        '''
+        if self._static is not None:
+            return self._static
+        return not callable(self._power_value)
+
+    def stamp_key(self, world):
+        '''
+        all attributes of point and world, which are used by _build_stamp (subclasses MUST extend key with their attributes)
+        '''
+        return (self.x, self.y, self._power_value, self.default_power, world.w, world.h)
 
     def update_world(self, world):
         if self.layer_type == LAYER_TYPE.HEIGHT:
@@ -46,7 +79,39 @@ class BasePoint(object):
         return logger.value
 
     def update_powers(self, layer, world):
-        pass
+        x, y, powers = self.get_stamp(world)
+
+        if layer.use_arrays:
+            powers = self._get_stamp_array(powers, layer.POWER_DTYPE)
+
+        layer.apply_powers(x, y, powers)
+
+    def _get_stamp_array(self, powers, dtype):
+        '''
+        powers of stamp as numpy array, it is converted once for every built stamp
+        '''
+        if self._stamp_array is None or self._stamp_array[0] is not powers or self._stamp_array[1] != dtype:
+            self._stamp_array = (powers, dtype, np.asarray(powers, dtype=dtype))
+
+        return self._stamp_array[2]
+
+    def get_stamp(self, world):
+        '''
+        coordinates of top left corner and rect of powers, which point adds to layer
+
+        stamp is cached while point position, power and world size are not changed,
+        callable power can depend on world state, so stamp is rebuilt every time for it
+        '''
+        key = self.stamp_key(world)
+
+        if self._stamp is None or self._stamp_key != key or callable(self._power_value):
+            self._stamp = self._build_stamp(world)
+            self._stamp_key = key
+
+        return self._stamp
+
+    def _build_stamp(self, world):
+        return self.x, self.y, []
 
     def _get_powers_rect(self, w, h):
         powers = []
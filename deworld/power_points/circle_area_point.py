@@ -11,14 +11,14 @@ class CircleAreaPoint(BasePoint):
         self.radius = radius
         self.normalizer = normalizer
 
-    def update_powers(self, layer, world):
+    def stamp_key(self, world):
+        return super(CircleAreaPoint, self).stamp_key(world) + (self.radius, self.normalizer)
 
-        w = h = 1+self.radius*2
+    def _build_stamp(self, world):
 
-        if self._powers is None:
-            self._powers = self._get_powers_rect(w=w, h=h)
+        w = h = 1+self.radius*2
 
-        powers = self._powers
+        powers = self._get_powers_rect(w=w, h=h)
 
         for y in xrange(h):
 
@@ -33,4 +33,4 @@ class CircleAreaPoint(BasePoint):
                     continue
                 powers[y][x] = self.normalizer(self.power(world, self.x+x-self.radius, self.y+y-self.radius), float(distance)/self.radius)
 
-        layer.apply_powers(self.x-self.radius, self.y-self.radius, powers)
+        return self.x-self.radius, self.y-self.radius, powers
@@ -0,0 +1,100 @@
+# coding: utf-8
+import sys
+import Queue
+
+from deworld.exceptions import DeworldException
+
+
+class Task(object):
+
+    def __init__(self, name, function, dependencies=()):
+        self.name = name
+        self.function = function
+        self.dependencies = frozenset(dependencies)
+
+
+def step_tasks(layers):
+    '''
+    tasks of world step:
+      - sync of every layer (syncs read only current data of layers, so they are independent);
+      - apply of every layer, that MUST wait for its own sync and for syncs of all layers, that read it.
+    '''
+    readers = dict((layer.TYPE, []) for layer in layers)
+
+    for layer in layers:
+        for layer_type in layer.READS:
+            if layer_type not in readers:
+                raise DeworldException('layer %r reads unknown layer %r' % (layer, layer_type))
+            readers[layer_type].append(layer)
+
+    tasks = [Task(name=('sync', layer.TYPE), function=layer.sync) for layer in layers]
+
+    for layer in layers:
+        dependencies = [('sync', layer.TYPE)] + [('sync', reader.TYPE) for reader in readers[layer.TYPE]]
+        tasks.append(Task(name=('apply', layer.TYPE), function=layer.apply, dependencies=dependencies))
+
+    return tasks
+
+
+def run_tasks(tasks, pool=None):
+    '''
+    run tasks in order of their dependencies
+
+    without pool tasks are runned one by one, always the first ready task in list
+    with pool (multiprocessing.pool.ThreadPool) every task is started as soon as all its dependencies are done
+    '''
+    names = set(task.name for task in tasks)
+
+    for task in tasks:
+        if not task.dependencies <= names:
+            raise DeworldException('task %r depends from unknown tasks %r' % (task.name, task.dependencies - names))
+
+    done = set()
+    waiting = list(tasks)
+
+    def get_ready_tasks():
+        ready = [task for task in waiting if task.dependencies <= done]
+        for task in ready:
+            waiting.remove(task)
+        return ready
+
+    if pool is None:
+        while waiting:
+            ready = [task for task in waiting if task.dependencies <= done]
+            if not ready:
+                raise DeworldException('cyclic dependencies between tasks %r' % [task.name for task in waiting])
+            ready[0].function()
+            done.add(ready[0].name)
+            waiting.remove(ready[0])
+        return
+
+    results = Queue.Queue()
+
+    def run(task):
+        try:
+            task.function()
+        except Exception:
+            results.put((task, sys.exc_info()))
+        else:
+            results.put((task, None))
+
+    running = 0
+
+    while waiting or running:
+        for task in get_ready_tasks():
+            pool.apply_async(run, (task,))
+            running += 1
+
+        if not running:
+            raise DeworldException('cyclic dependencies between tasks %r' % [task.name for task in waiting])
+
+        task, exc_info = results.get()
+        running -= 1
+
+        if exc_info is not None:
+            while running:
+                results.get()
+                running -= 1
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+        done.add(task.name)
@@ -0,0 +1,229 @@
+# coding: utf-8
+'''
+binary snapshots of worlds and deltas between them
+
+snapshot file:
+  - prefix: magic bytes, version and size of header (little-endian uint32);
+  - header: json with world attributes and descriptions of arrays (layer, grid, dtype, shape & offset);
+  - raw little-endian arrays of layers grids, every array is aligned to ALIGNMENT bytes
+    (offsets of arrays are counted from the first aligned position after header).
+
+arrays are loaded with numpy.memmap, so loading does not depend on world size
+
+delta has the same prefix (with DELTA_MAGIC) and header, followed by indexes (little-endian uint32)
+and values of changed cells for every grid
+'''
+import json
+import struct
+import StringIO
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.world import World
+from deworld.exceptions import DeworldException
+
+
+MAGIC = 'DEWORLD\x00'
+DELTA_MAGIC = 'DEWDELTA'
+VERSION = 1
+ALIGNMENT = 64
+
+_PREFIX = struct.Struct('<8sII')
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _grid_dtype(layer, grid_name):
+    dtype = layer.DATA_DTYPE if grid_name == 'data' else layer.POWER_DTYPE
+    return np.dtype(dtype).newbyteorder('<')
+
+
+def _read_header(snapshot_file, expected_magic=MAGIC):
+    prefix = snapshot_file.read(_PREFIX.size)
+
+    if len(prefix) != _PREFIX.size:
+        raise DeworldException('wrong snapshot: file is too short')
+
+    magic, version, header_size = _PREFIX.unpack(prefix)
+
+    if magic != expected_magic:
+        raise DeworldException('wrong snapshot: unknown file format')
+
+    if version != VERSION:
+        raise DeworldException('wrong snapshot: unsupported version %d (supported version is %d)' % (version, VERSION))
+
+    header = json.loads(snapshot_file.read(header_size))
+    header['data_start'] = _PREFIX.size + header_size
+    header['arrays_start'] = _aligned(header['data_start'])
+
+    return header
+
+
+def _snapshot_grids(world, powers=True):
+    for layer_name, layer in world.named_layers():
+        for grid_name in layer.snapshot_grids(powers=powers):
+            yield layer_name, layer, grid_name
+
+
+def save_snapshot(world, filename, powers=False):
+    '''
+    powers - save powers of layers too (for debug), otherwise they are recalculated after loading
+    '''
+    arrays = []
+    descriptions = []
+
+    for layer_name, layer, grid_name in _snapshot_grids(world, powers=powers):
+        array = layer._grid_to_array(getattr(layer, grid_name), dtype=_grid_dtype(layer, grid_name))
+        array = np.ascontiguousarray(array, dtype=_grid_dtype(layer, grid_name))
+
+        arrays.append(array)
+        descriptions.append({'layer': layer_name,
+                             'grid': grid_name,
+                             'dtype': array.dtype.str,
+                             'shape': array.shape,
+                             'offset': None})
+
+    offset = 0
+    for array, description in zip(arrays, descriptions):
+        description['offset'] = offset
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({'w': world.w,
+                         'h': world.h,
+                         'seed': world.seed,
+                         'turn': world.turn,
+                         'arrays': descriptions})
+
+    arrays_start = _aligned(_PREFIX.size + len(header))
+
+    with open(filename, 'wb') as snapshot_file:
+        snapshot_file.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+        snapshot_file.write(header)
+
+        for array, description in zip(arrays, descriptions):
+            snapshot_file.seek(arrays_start + description['offset'])
+            snapshot_file.write(array.tostring())
+
+
+def load_snapshot(filename, config, mode='c'):
+    '''
+    mode - mode of numpy.memmap:
+      'c' - copy-on-write, changes of world are not saved to file (default);
+      'r' - read only, world can be only read (not stepped).
+
+    for lists storage data are copied into lists
+    '''
+    with open(filename, 'rb') as snapshot_file:
+        header = _read_header(snapshot_file)
+
+    arrays = {}
+    layers_data = {}
+
+    for description in header['arrays']:
+        array = np.memmap(filename,
+                          dtype=np.dtype(str(description['dtype'])),
+                          mode=mode,
+                          offset=header['arrays_start'] + description['offset'],
+                          shape=tuple(description['shape']))
+        arrays[(description['layer'], description['grid'])] = array
+        layers_data.setdefault('layer_%s' % description['layer'], {})[description['grid']] = array
+
+    # layers are created directly around mapped arrays, so only grids, that are not stored in snapshot, are allocated
+    world = World(w=header['w'], h=header['h'], config=config, seed=header['seed'], turn=header['turn'], **layers_data)
+
+    world.read_only = (mode == 'r')
+    world.check_loaded_powers(arrays)
+
+    return world
+
+
+def create_delta(base_world, world, powers=False):
+    '''
+    delta (string) with cells of world, that differ from cells of base world
+
+    powers - save changes of powers too (see save_snapshot)
+    '''
+    if (base_world.w, base_world.h) != (world.w, world.h):
+        raise DeworldException('can not create delta between worlds of different sizes')
+
+    arrays = []
+    descriptions = []
+
+    offset = 0
+
+    for (layer_name, base_layer, grid_name), (_, layer, _) in zip(_snapshot_grids(base_world, powers=powers),
+                                                                  _snapshot_grids(world, powers=powers)):
+        dtype = _grid_dtype(layer, grid_name)
+
+        base_cells = base_layer._cells_array(base_layer._grid_to_array(getattr(base_layer, grid_name), dtype=dtype))
+        cells = layer._cells_array(layer._grid_to_array(getattr(layer, grid_name), dtype=dtype))
+
+        indexes = np.flatnonzero((base_cells != cells).any(axis=1)).astype('<u4')
+        values = np.ascontiguousarray(cells[indexes], dtype=dtype)
+
+        arrays.extend((indexes, values))
+        descriptions.append({'layer': layer_name,
+                             'grid': grid_name,
+                             'dtype': dtype.str,
+                             'values_number': cells.shape[1],
+                             'cells_number': len(indexes),
+                             'offset': offset})
+
+        offset += indexes.nbytes + values.nbytes
+
+    header = json.dumps({'w': world.w,
+                         'h': world.h,
+                         'seed': world.seed,
+                         'base_turn': base_world.turn,
+                         'turn': world.turn,
+                         'arrays': descriptions})
+
+    return ''.join([_PREFIX.pack(DELTA_MAGIC, VERSION, len(header)), header] + [array.tostring() for array in arrays])
+
+
+def apply_delta(world, delta):
+    '''
+    replay delta onto world, world MUST be in the same state as base world of delta
+    '''
+    header = _read_header(StringIO.StringIO(delta), expected_magic=DELTA_MAGIC)
+
+    if (header['w'], header['h']) != (world.w, world.h):
+        raise DeworldException('delta is created for world of other size')
+
+    if header['base_turn'] != world.turn:
+        raise DeworldException('delta is created for turn %d, but world is on turn %d' % (header['base_turn'], world.turn))
+
+    descriptions = dict(((description['layer'], description['grid']), description) for description in header['arrays'])
+
+    for layer_name, layer, grid_name in _snapshot_grids(world):
+        description = descriptions.get((layer_name, grid_name))
+
+        if description is None or not description['cells_number']:
+            continue
+
+        dtype = np.dtype(str(description['dtype']))
+        offset = header['data_start'] + description['offset']
+
+        indexes = np.frombuffer(delta, dtype='<u4', count=description['cells_number'], offset=offset)
+        values = np.frombuffer(delta,
+                               dtype=dtype,
+                               count=description['cells_number'] * description['values_number'],
+                               offset=offset + indexes.nbytes).reshape((-1, description['values_number']))
+
+        # for arrays storage grid array shares memory with grid, so it is changed in place
+        array = layer._grid_to_array(getattr(layer, grid_name), dtype=dtype)
+        layer._cells_array(array)[indexes] = values
+
+        if not layer.use_arrays:
+            setattr(layer, grid_name, layer._grid_from_array(array))
+
+    world.seed = header['seed']
+    world.turn = header['turn']
+
+    world.clear_cells_cache()
+
+    world.check_loaded_powers(descriptions)
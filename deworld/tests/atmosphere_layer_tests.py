@@ -0,0 +1,86 @@
+# coding: utf-8
+import random
+
+from unittest import TestCase
+
+from deworld.world import World
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld.layers import VEGETATION_TYPE
+from deworld.layers.atmosphere_layer import AtmospherePoint
+
+
+class AtmosphereLayerTests(TestCase):
+
+    W = 13
+    H = 9
+
+    def setUp(self):
+        self.lists_world = World(w=self.W, h=self.H, config=BaseConfig)
+        self.arrays_world = World(w=self.W, h=self.H, config=ArraysConfig)
+
+    def fill_worlds(self, wind_getter):
+        random.seed(3)
+
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                point = AtmospherePoint(wind=wind_getter(x, y), temperature=random.uniform(0, 1), wetness=random.uniform(0, 1))
+                wind = (random.uniform(-1, 1), random.uniform(-1, 1))
+                vegetation = random.choice([VEGETATION_TYPE.DESERT, VEGETATION_TYPE.GRASS, VEGETATION_TYPE.FOREST])
+                temperature = random.uniform(0, 1)
+                wetness = random.uniform(0, 1)
+
+                for world in (self.lists_world, self.arrays_world):
+                    world.layer_atmosphere.data[y][x] = point
+                    world.layer_wind.data[y][x] = wind
+                    world.layer_vegetation.data[y][x] = vegetation
+                    world.layer_temperature.data[y][x] = temperature
+                    world.layer_wetness.data[y][x] = wetness
+
+    def check_sync(self):
+        self.lists_world.layer_atmosphere.sync()
+        self.arrays_world.layer_atmosphere.sync()
+
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                expected = self.lists_world.layer_atmosphere.next_data[y][x]
+                point = self.arrays_world.layer_atmosphere.next_data[y][x]
+
+                self.assertAlmostEqual(point.wind[0], expected.wind[0], places=12)
+                self.assertAlmostEqual(point.wind[1], expected.wind[1], places=12)
+                self.assertAlmostEqual(point.temperature, expected.temperature, places=12)
+                self.assertAlmostEqual(point.wetness, expected.wetness, places=12)
+
+    def test_sync_random_winds(self):
+        self.fill_worlds(lambda x, y: (random.uniform(-1, 1), random.uniform(-1, 1)))
+        self.check_sync()
+
+    def test_sync_exact_hits(self):
+        # points without wind and points, that moved to the cells centers, hit cells exactly
+        self.fill_worlds(lambda x, y: random.choice([(0.0, 0.0), (1.0/3, -2.0/3), (-1.0, 1.0), (random.uniform(-1, 1), 0.0)]))
+        self.check_sync()
+
+    def test_sync_negative_positions(self):
+        # int() rounds negative coordinates to zero, so several deltas can affect the same cell
+        self.fill_worlds(lambda x, y: (-0.9, -0.9))
+        self.check_sync()
+
+    def test_arrays_storage_channels(self):
+        layer = self.arrays_world.layer_atmosphere
+        layer.data[2][3] = AtmospherePoint(wind=(0.25, -0.5), temperature=0.75, wetness=0.125)
+
+        self.assertEqual(layer.data.channels.shape, (4, self.H, self.W))
+        self.assertEqual(layer.data.channels.nbytes, 32 * self.W * self.H)
+
+        self.assertEqual(layer.data[2][3], AtmospherePoint(wind=(0.25, -0.5), temperature=0.75, wetness=0.125))
+        self.assertEqual(layer.data.wind[2][3].tolist(), [0.25, -0.5])
+        self.assertEqual((layer.data.wind_x[2][3], layer.data.wind_y[2][3]), (0.25, -0.5))
+        self.assertEqual(layer.data.temperature[2][3], 0.75)
+        self.assertEqual(layer.data.wetness[2][3], 0.125)
+
+    def test_arrays_storage_resize(self):
+        for world in (self.lists_world, self.arrays_world):
+            world.layer_atmosphere.data[self.H-1][self.W-1] = AtmospherePoint(wind=(0.25, -0.5), temperature=0.75, wetness=0.125)
+            world.resize(self.W+3, self.H+2)
+
+        self.assertEqual(self.arrays_world.layer_atmosphere.data.tolist(), self.lists_world.layer_atmosphere.data)
+        self.assertEqual(self.arrays_world.layer_atmosphere, self.lists_world.layer_atmosphere)
@@ -0,0 +1,250 @@
+# coding: utf-8
+import os
+import random
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+import mock
+import numpy as np
+
+from PIL import Image
+
+from deworld.world import World
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld.layers import LAYER_TYPE
+from deworld.power_points import CircleAreaPoint
+from deworld import normalizers
+from deworld.layers.atmosphere_layer import AtmospherePoint
+from deworld.map_colors import HeightColorMap
+from deworld.exceptions import DeworldException
+from deworld import cartographer
+
+
+class CartographerTests(TestCase):
+
+    W = 13
+    H = 9
+
+    def setUp(self):
+        self.catalog = tempfile.mkdtemp()
+
+        self.world = World(w=self.W, h=self.H, config=BaseConfig, seed=5)
+
+        random.seed(5)
+
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                self.world.layer_height.data[y][x] = random.uniform(-1, 1)
+                self.world.layer_temperature.data[y][x] = random.uniform(0, 1)
+                self.world.layer_wetness.data[y][x] = random.uniform(0, 1)
+                self.world.layer_soil.data[y][x] = random.uniform(0, 1)
+                self.world.layer_wind.data[y][x] = (random.uniform(-1, 1), random.uniform(-1, 1))
+                self.world.layer_vegetation.data[y][x] = random.randint(0, 2)
+                self.world.layer_atmosphere.data[y][x] = AtmospherePoint(wind=(random.uniform(-1, 1), random.uniform(-1, 1)),
+                                                                         temperature=random.uniform(0, 1),
+                                                                         wetness=random.uniform(0, 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.catalog)
+
+    def image_data(self, catalog, turn=0):
+        return list(Image.open(os.path.join(catalog, '%.3d.png' % turn)).getdata())
+
+    def check_draw_world(self, world):
+        cartographer.draw_world(0, world, catalog=os.path.join(self.catalog, 'arrays'))
+
+        colorizers = {'height': (self.world.layer_height, HeightColorMap.get_color),
+                      'temperature': (self.world.layer_temperature, cartographer.temperature_colorizer),
+                      'wind': (self.world.layer_wind, cartographer.wind_colorizer),
+                      'wetness': (self.world.layer_wetness, cartographer.wetness_colorizer),
+                      'vegetation': (self.world.layer_vegetation, cartographer.vegetation_colorizer),
+                      'soil': (self.world.layer_soil, cartographer.soil_colorizer),
+                      'atmo_wind': (self.world.layer_atmosphere, cartographer.atmo_wind_colorizer),
+                      'atmo_temperature': (self.world.layer_atmosphere, cartographer.atmo_temperature_colorizer),
+                      'atmo_wetness': (self.world.layer_atmosphere, cartographer.atmo_wetness_colorizer)}
+
+        for field_name, (layer, colorizer) in colorizers.items():
+            catalog = os.path.join(self.catalog, 'cells', field_name)
+            cartographer.draw_image(0, catalog, layer=layer, power_points=self.world.power_points, colorizer=colorizer)
+
+            self.assertEqual(self.image_data(os.path.join(self.catalog, 'arrays', field_name)), self.image_data(catalog))
+
+    def test_draw_world(self):
+        self.check_draw_world(self.world)
+
+    def test_draw_world_arrays(self):
+        self.check_draw_world(World.deserialize(config=ArraysConfig, data=self.world.serialize()))
+
+    def test_draw_world_without_numpy(self):
+        cartographer.draw_world(0, self.world, catalog=os.path.join(self.catalog, 'arrays'))
+
+        with mock.patch('deworld.cartographer.np', None):
+            cartographer.draw_world(0, self.world, catalog=os.path.join(self.catalog, 'cells'))
+
+            writer = cartographer.ImageWriter()
+            self.assertEqual(writer.pool, None)
+            writer.draw_world(1, self.world, catalog=os.path.join(self.catalog, 'cells'))
+            writer.close()
+
+            self.assertRaises(DeworldException, cartographer.FramesWriter, self.catalog)
+
+        for field_name, colorizer in cartographer.LAYERS_ARRAY_COLORIZERS:
+            for turn in (0, 1):
+                self.assertEqual(self.image_data(os.path.join(self.catalog, 'cells', field_name), turn=turn),
+                                 self.image_data(os.path.join(self.catalog, 'arrays', field_name)))
+
+    def test_draw_array_power_points(self):
+        point = type('Point', (object,), {'x': 3, 'y': 2})
+        outside_point = type('Point', (object,), {'x': self.W, 'y': 0})
+
+        cartographer.draw_array(7, self.catalog,
+                                values=self.world.cells_arrays().soil,
+                                power_points={'point': point, 'outside': outside_point},
+                                colorizer=cartographer.soil_array_colorizer)
+
+        data = self.image_data(self.catalog, turn=7)
+
+        self.assertEqual(data[2 * self.W + 3], (0, 0, 0))
+        self.assertEqual(data[0], cartographer.soil_colorizer(self.world.layer_soil.data[0][0]).rgb)
+
+    def test_viewport_cells(self):
+        self.world.add_power_point(CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE, name='inside', x=7, y=6, power=0.5, radius=3, normalizer=normalizers.linear))
+        self.world.add_power_point(CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE, name='outside', x=2, y=6, power=0.5, radius=3, normalizer=normalizers.linear))
+
+        cells, power_points = cartographer.viewport_cells(self.world, viewport=(3, 2, 20, 5), downsample=2)
+
+        self.assertEqual(cells.height.shape, (3, 5))
+        self.assertEqual(cells.wind.shape, (3, 5, 2))
+        self.assertEqual(power_points, {'inside': cartographer.PointPosition(x=2, y=2)})
+
+        height = np.array(self.world.layer_height.data)[2:7, 3:]
+        self.assertAlmostEqual(cells.height[1][4], height[2:4, 8:10].mean())
+        self.assertAlmostEqual(cells.height[2][4], height[4:5, 8:10].mean())
+
+        vegetation = np.array(self.world.layer_vegetation.data)[2:7, 3:]
+        block = vegetation[0:2, 2:4].ravel().tolist()
+        self.assertEqual(block.count(cells.vegetation[0][1]), max(block.count(vegetation_type) for vegetation_type in xrange(3)))
+
+    def test_wrong_viewport(self):
+        for viewport in ((-1, 0, 5, 5), (0, -1, 5, 5), (self.W, 0, 5, 5), (0, self.H, 5, 5), (3, 2, 0, 5), (3, 2, 5, 0)):
+            self.assertRaises(DeworldException, cartographer.viewport_cells, self.world, viewport=viewport)
+            self.assertRaises(DeworldException, cartographer.draw_image, 0, self.catalog, layer=self.world.layer_soil, power_points={},
+                              colorizer=cartographer.soil_colorizer, viewport=viewport)
+
+        self.assertFalse(os.path.exists(os.path.join(self.catalog, '000.png')))
+
+    def test_wrong_downsample(self):
+        self.assertRaises(DeworldException, cartographer.viewport_cells, self.world, downsample=0)
+        self.assertRaises(DeworldException, cartographer.draw_image, 0, self.catalog, layer=self.world.layer_soil, power_points={},
+                          colorizer=cartographer.soil_colorizer, downsample=0)
+
+    def test_draw_world_downsampled(self):
+        cartographer.draw_world(0, self.world, catalog=self.catalog, viewport=(3, 2, 8, 6), downsample=3)
+
+        cells, power_points = cartographer.viewport_cells(self.world, viewport=(3, 2, 8, 6), downsample=3)
+
+        image = Image.open(os.path.join(self.catalog, 'soil', '000.png'))
+        self.assertEqual(image.size, (3, 2))
+        self.assertEqual(np.array(image).tolist(), cartographer.soil_array_colorizer(cells.soil).tolist())
+
+    def test_draw_image_viewport(self):
+        self.world.add_power_point(CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE, name='circle', x=5, y=4, power=0.5, radius=3, normalizer=normalizers.linear))
+
+        cartographer.draw_image(0, self.catalog, layer=self.world.layer_soil, power_points=self.world.power_points,
+                                colorizer=cartographer.soil_colorizer, viewport=(3, 2, 20, 5), downsample=2)
+
+        image = Image.open(os.path.join(self.catalog, '000.png'))
+        self.assertEqual(image.size, (5, 3))
+
+        data = np.array(image)
+
+        self.assertEqual(tuple(data[1][1]), (0, 0, 0))
+        self.assertEqual(tuple(data[2][3]), cartographer.soil_colorizer(self.world.layer_soil.data[6][9]).rgb)
+
+    def test_draw_image_atmosphere_arrays(self):
+        world = World.deserialize(config=ArraysConfig, data=self.world.serialize())
+
+        for viewport, downsample in ((None, 1), ((1, 1, 4, 4), 2)):
+            cartographer.draw_image(0, os.path.join(self.catalog, 'lists'), layer=self.world.layer_atmosphere, power_points={},
+                                    colorizer=cartographer.atmo_temperature_colorizer, viewport=viewport, downsample=downsample)
+            cartographer.draw_image(0, os.path.join(self.catalog, 'arrays'), layer=world.layer_atmosphere, power_points={},
+                                    colorizer=cartographer.atmo_temperature_colorizer, viewport=viewport, downsample=downsample)
+
+            self.assertEqual(self.image_data(os.path.join(self.catalog, 'arrays')), self.image_data(os.path.join(self.catalog, 'lists')))
+
+    def test_image_writer(self):
+        self.world.add_power_point(CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE, name='circle', x=3, y=2, power=0.5, radius=3, normalizer=normalizers.linear))
+
+        writer = cartographer.ImageWriter(processes=2, max_pending=2)
+
+        for turn in xrange(3):
+            writer.draw_world(turn, self.world, catalog=os.path.join(self.catalog, 'writer'))
+            self.assertTrue(len(writer.pending) <= 2)
+
+            cartographer.draw_world(turn, self.world, catalog=os.path.join(self.catalog, 'world'))
+
+            self.world.do_step()
+
+        writer.close()
+
+        for field_name, colorizer in cartographer.LAYERS_ARRAY_COLORIZERS:
+            for turn in xrange(3):
+                self.assertEqual(self.image_data(os.path.join(self.catalog, 'writer', field_name), turn=turn),
+                                 self.image_data(os.path.join(self.catalog, 'world', field_name), turn=turn))
+
+    def test_image_writer_wrong_max_pending(self):
+        self.assertRaises(DeworldException, cartographer.ImageWriter, processes=1, max_pending=0)
+
+    def write_frames(self, frames_format, turns=3, **kwargs):
+        writer = cartographer.FramesWriter(os.path.join(self.catalog, 'frames'), format=frames_format, **kwargs)
+
+        expected_frames = []
+
+        for turn in xrange(turns):
+            writer.draw_world(turn, self.world)
+            expected_frames.append(cartographer.colorize_array(self.world.cells_arrays().height,
+                                                               self.world.power_points,
+                                                               cartographer.HeightColorMap.get_colors))
+            self.world.do_step()
+
+        writer.close()
+
+        return expected_frames
+
+    def test_frames_stream(self):
+        expected_frames = self.write_frames(cartographer.FRAMES_FORMAT.STREAM)
+
+        frames = list(cartographer.read_frames(os.path.join(self.catalog, 'frames', 'height.frames')))
+
+        self.assertEqual([turn for turn, colors in frames], [0, 1, 2])
+
+        for (turn, colors), expected_colors in zip(frames, expected_frames):
+            self.assertTrue(np.array_equal(colors, expected_colors))
+
+    def test_frames_gif(self):
+        self.write_frames(cartographer.FRAMES_FORMAT.GIF)
+
+        for field_name, colorizer in cartographer.LAYERS_ARRAY_COLORIZERS:
+            image = Image.open(os.path.join(self.catalog, 'frames', '%s.gif' % field_name))
+            self.assertEqual(image.size, (self.W, self.H))
+
+        # equal sequential frames (e.g. of height without powers) are merged by gif encoder
+        self.assertEqual(Image.open(os.path.join(self.catalog, 'frames', 'temperature.gif')).n_frames, 3)
+
+        self.assertFalse(os.path.exists(os.path.join(self.catalog, 'frames', 'height.frames')))
+
+    def test_frames_sprites(self):
+        expected_frames = self.write_frames(cartographer.FRAMES_FORMAT.SPRITES, turns=5, columns=2)
+
+        image = Image.open(os.path.join(self.catalog, 'frames', 'height.png'))
+        self.assertEqual(image.size, (self.W * 2, self.H * 3))
+
+        sheet = np.array(image)
+
+        self.assertTrue(np.array_equal(sheet[self.H:self.H*2, self.W:self.W*2], expected_frames[3]))
+        self.assertTrue(np.array_equal(sheet[self.H*2:, self.W:], np.zeros((self.H, self.W, 3))))
+
+    def test_frames_wrong_format(self):
+        self.assertRaises(DeworldException, cartographer.FramesWriter, self.catalog, format='apng')
@@ -0,0 +1,69 @@
+# coding: utf-8
+import random
+
+from unittest import TestCase
+
+from deworld.world import World
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld.layers import VEGETATION_TYPE
+from deworld.layers.atmosphere_layer import AtmospherePoint
+
+
+class ArraysLayersTests(TestCase):
+
+    W = 17
+    H = 13
+
+    def setUp(self):
+        self.lists_world = World(w=self.W, h=self.H, config=BaseConfig)
+        self.arrays_world = World(w=self.W, h=self.H, config=ArraysConfig)
+
+        random.seed(4)
+
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                height = random.uniform(-1, 1)
+                height_power = random.choice([(0.0, 0.0), (0.5, 0.0), (0.0, 0.5), (0.3, 0.305)])
+                temperature = random.uniform(0, 1)
+                wetness = random.uniform(0, 1)
+                soil = random.uniform(0, 1)
+                wind = random.choice([(0.0, 0.0), (random.uniform(-1, 1), random.uniform(-1, 1))])
+                vegetation = random.choice([VEGETATION_TYPE.DESERT, VEGETATION_TYPE.GRASS, VEGETATION_TYPE.FOREST])
+                point = AtmospherePoint(wind=(0.0, 0.0), temperature=random.uniform(0, 1), wetness=random.uniform(0, 1))
+                powers = [random.uniform(-0.5, 1.5) for i in xrange(3)]
+
+                for world in (self.lists_world, self.arrays_world):
+                    world.layer_height.data[y][x] = height
+                    world.layer_height.power[y][x] = height_power
+                    world.layer_temperature.data[y][x] = temperature
+                    world.layer_temperature.power[y][x] = powers[0]
+                    world.layer_wetness.data[y][x] = wetness
+                    world.layer_wetness.power[y][x] = powers[1]
+                    world.layer_soil.data[y][x] = soil
+                    world.layer_soil.power[y][x] = powers[2]
+                    world.layer_wind.data[y][x] = wind
+                    world.layer_vegetation.data[y][x] = vegetation
+                    world.layer_atmosphere.data[y][x] = point
+
+    def check_sync(self, layer_name):
+        lists_layer = getattr(self.lists_world, layer_name)
+        arrays_layer = getattr(self.arrays_world, layer_name)
+
+        lists_layer.sync()
+        arrays_layer.sync()
+
+        self.assertEqual(arrays_layer.next_data.tolist(), lists_layer.next_data)
+        self.assertEqual(arrays_layer.serialize(powers=True)['power'], [[list(power) if isinstance(power, tuple) else power for power in row]
+                                                            for row in lists_layer.power])
+
+    def test_height(self):
+        self.check_sync('layer_height')
+
+    def test_temperature(self):
+        self.check_sync('layer_temperature')
+
+    def test_wetness(self):
+        self.check_sync('layer_wetness')
+
+    def test_soil(self):
+        self.check_sync('layer_soil')
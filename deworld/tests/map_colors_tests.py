@@ -0,0 +1,76 @@
+# coding: utf-8
+import numpy as np
+
+from unittest import TestCase
+
+from deworld.map_colors import TABLE_SIZE, Color, ColorTable, ColorMap, HeightColorMap, TemperatureColorMap, WindColorMap
+from deworld.exceptions import DeworldException
+
+
+class ColorTableTests(TestCase):
+
+    def setUp(self):
+        self.table = ColorTable(lambda value: Color(int(255*value), 0, 0), 0.0, 1.0, size=4)
+
+    def test_colors(self):
+        self.assertEqual([color.red for color in self.table.colors], [31, 95, 159, 223])
+
+    def test_get_color(self):
+        self.assertEqual(self.table.get_color(0.0).red, 31)
+        self.assertEqual(self.table.get_color(0.3).red, 95)
+        self.assertEqual(self.table.get_color(1.0).red, 223)
+
+    def test_get_color_out_of_range(self):
+        self.assertEqual(self.table.get_color(-5.0).red, 31)
+        self.assertEqual(self.table.get_color(5.0).red, 223)
+
+    def test_get_colors(self):
+        values = np.array([[-5.0, 0.0, 0.3], [0.5, 1.0, 5.0]])
+        colors = self.table.get_colors(values)
+
+        self.assertEqual(colors.shape, (2, 3, 3))
+        self.assertEqual(colors.dtype, np.uint8)
+        self.assertEqual(colors.tolist(), [[list(self.table.get_color(value).rgb) for value in row] for row in values])
+
+
+class ColorMapTests(TestCase):
+
+    def test_table_cached(self):
+        self.assertTrue(HeightColorMap.get_table(discret=True) is HeightColorMap.get_table(discret=True))
+        self.assertFalse(HeightColorMap.get_table(discret=True) is HeightColorMap.get_table(discret=False))
+        self.assertFalse(HeightColorMap.get_table(discret=True) is TemperatureColorMap.get_table(discret=True))
+        self.assertEqual(HeightColorMap.get_table().size, TABLE_SIZE)
+
+    def test_table_shared_between_discretization_modes(self):
+        self.assertTrue(TemperatureColorMap.get_table(discret=True) is TemperatureColorMap.get_table(discret=False))
+
+    def test_calculate_color_not_implemented(self):
+        self.assertRaises(DeworldException, ColorMap.calculate_color, 0.5)
+
+    def test_height_colors(self):
+        for i in (0, 200, 511, 512, 700, TABLE_SIZE-1):
+            height = -1.0 + (i + 0.5) * 2.0 / TABLE_SIZE
+
+            for discret in (True, False):
+                self.assertEqual(HeightColorMap.get_color(height, discret=discret), HeightColorMap.calculate_color(height, discret=discret))
+
+    def test_height_water_border(self):
+        self.assertEqual(HeightColorMap.get_color(-0.0001), HeightColorMap.LOW_COLORS[0])
+        self.assertEqual(HeightColorMap.get_color(0.0), HeightColorMap.HIGH_COLORS[0])
+
+    def test_wind_colors(self):
+        wind = np.array([[(-1.0, 1.0), (0.5, -0.25)]])
+        self.assertEqual(WindColorMap.get_wind_colors(wind).tolist(),
+                         [[list(WindColorMap.get_wind_color(cell).rgb) for cell in row] for row in wind])
+
+    def test_wind_color_components(self):
+        color = WindColorMap.get_wind_color((-1.0, 1.0))
+
+        self.assertEqual(color.red, int(255 * WindColorMap.RED))
+        self.assertEqual(color.green, WindColorMap.get_wind_color((-1.0, -1.0)).green)
+        self.assertEqual(color.blue, WindColorMap.get_wind_color((1.0, 1.0)).blue)
+        self.assertTrue(color.green < color.blue)
+
+    def test_wind_without_scalar_colors(self):
+        self.assertFalse(hasattr(WindColorMap, 'get_color'))
+        self.assertFalse(hasattr(WindColorMap, 'get_colors'))
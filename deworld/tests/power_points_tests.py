@@ -0,0 +1,207 @@
+# coding: utf-8
+import math
+
+from unittest import TestCase
+
+from deworld.world import World
+from deworld.layers import LAYER_TYPE
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld import power_points
+from deworld import normalizers
+
+
+class PowerPointsTests(TestCase):
+
+    W = 20
+    H = 15
+
+    CONFIG = BaseConfig
+
+    def setUp(self):
+        self.world = World(w=self.W, h=self.H, config=self.CONFIG)
+
+        self.circle = power_points.CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE,
+                                                   name='circle',
+                                                   x=3,
+                                                   y=4,
+                                                   power=0.5,
+                                                   radius=5,
+                                                   normalizer=normalizers.linear)
+
+        arrow = power_points.ArrowAreaPoint.Arrow(angle=math.pi/4, length=6, width=2)
+        self.arrow = power_points.ArrowAreaPoint(layer_type=LAYER_TYPE.WETNESS,
+                                                 name='arrow',
+                                                 x=12,
+                                                 y=10,
+                                                 power=1.0,
+                                                 length_normalizer=normalizers.linear,
+                                                 width_normalizer=normalizers.linear,
+                                                 arrows=[arrow, arrow.rounded_arrow])
+
+    def test_circle_powers(self):
+        self.circle.update_world(self.world)
+
+        power = self.world.layer_temperature.power
+
+        self.assertEqual(power[4][3], 0.5)
+        self.assertEqual(power[4][5], 0.5*(1-2.0/5))
+        self.assertEqual(power[0][0], 0.5*(1-5.0/5))
+        self.assertEqual(power[4][9], 0.0)
+
+    def test_stamp_cached(self):
+        stamp = self.circle.get_stamp(self.world)
+        self.assertTrue(self.circle.get_stamp(self.world) is stamp)
+
+        self.arrow.update_world(self.world)
+        stamp = self.arrow.get_stamp(self.world)
+        self.arrow.update_world(self.world)
+        self.assertTrue(self.arrow.get_stamp(self.world) is stamp)
+
+    def test_stamp_rebuilt(self):
+        stamp = self.circle.get_stamp(self.world)
+
+        self.circle.x += 1
+        self.assertEqual(self.circle.get_stamp(self.world)[0], stamp[0]+1)
+
+        self.circle.power = 0.25
+        self.assertEqual(self.circle.get_stamp(self.world)[2][5][5], 0.25)
+
+        self.world.resize(self.W+2, self.H+2)
+        self.assertFalse(self.circle.get_stamp(self.world) is stamp)
+
+    def test_stamp_rebuilt_on_shape_change(self):
+        stamp = self.circle.get_stamp(self.world)
+
+        self.circle.radius = 3
+        self.assertEqual(len(self.circle.get_stamp(self.world)[2]), 7)
+
+        self.circle.normalizer = normalizers.equal
+        self.assertEqual(self.circle.get_stamp(self.world)[2][3][1], 0.5)
+
+        stamp = self.arrow.get_stamp(self.world)
+
+        self.arrow.arrows = [self.arrow.arrows[0]._replace(length=3)]
+        self.assertFalse(self.arrow.get_stamp(self.world) is stamp)
+
+        stamp = self.arrow.get_stamp(self.world)
+
+        self.arrow.width_normalizer = normalizers.equal
+        self.assertFalse(self.arrow.get_stamp(self.world) is stamp)
+
+    def test_callable_power_not_cached(self):
+        powers = iter([0.25, 0.75])
+        self.circle.power = lambda world, x, y: powers.next() if (x, y) == (3, 4) else 0.0
+
+        self.circle.update_world(self.world)
+        self.assertEqual(self.world.layer_temperature.power[4][3], 0.25)
+
+        self.world.layer_temperature.reset_powers()
+        self.circle.update_world(self.world)
+        self.assertEqual(self.world.layer_temperature.power[4][3], 0.75)
+
+    def test_same_powers_every_step(self):
+        self.world.add_power_point(self.circle)
+        self.world.add_power_point(self.arrow)
+
+        self.world.update_powers()
+        temperature_power = self.world.layer_temperature.serialize(powers=True)['power']
+        wetness_power = self.world.layer_wetness.serialize(powers=True)['power']
+
+        self.world.update_powers()
+        self.assertEqual(self.world.layer_temperature.serialize(powers=True)['power'], temperature_power)
+        self.assertEqual(self.world.layer_wetness.serialize(powers=True)['power'], wetness_power)
+
+    def test_static_powers_in_base_power(self):
+        self.world.add_power_point(self.circle)
+        self.world.update_powers()
+
+        self.assertEqual(self.world.layer_temperature.base_power[4][3], 0.5)
+        self.assertEqual(self.world.layer_temperature._dump_grid(self.world.layer_temperature.base_power),
+                         self.world.layer_temperature.serialize(powers=True)['power'])
+
+    def test_dynamic_powers_not_in_base_power(self):
+        self.circle.power = lambda world, x, y: 0.5
+        self.world.add_power_point(self.circle)
+        self.world.update_powers()
+
+        self.assertEqual(self.world.layer_temperature.base_power[4][3], 0.0)
+        self.assertEqual(self.world.layer_temperature.power[4][3], 0.5)
+
+    def test_static_point_forced(self):
+        circle = power_points.CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE,
+                                              name='circle',
+                                              x=3,
+                                              y=4,
+                                              power=lambda world, x, y: 0.5,
+                                              radius=5,
+                                              normalizer=normalizers.linear,
+                                              static=True)
+        self.world.add_power_point(circle)
+        self.world.update_powers()
+
+        self.assertEqual(self.world.layer_temperature.base_power[4][3], 0.5)
+
+    def test_base_power_rebuilt(self):
+        self.world.add_power_point(self.circle)
+        self.world.update_powers()
+
+        self.circle.x += 2
+        self.world.update_powers()
+        self.assertEqual(self.world.layer_temperature.base_power[4][3], 0.5*(1-2.0/5))
+        self.assertEqual(self.world.layer_temperature.base_power[4][5], 0.5)
+
+        self.world.clear_power_points()
+        self.world.update_powers()
+        self.assertEqual(self.world.layer_temperature.base_power[4][5], 0.0)
+        self.assertEqual(self.world.layer_temperature.power[4][5], 0.0)
+
+    def test_apply_powers_clipped(self):
+        layer = self.world.layer_height
+        layer.apply_powers(-1, self.H-2, [[(1.0, 2.0), (3.0, 4.0), (5.0, 6.0)],
+                                          [(7.0, 8.0), (9.0, 10.0), (11.0, 12.0)],
+                                          [(13.0, 14.0), (15.0, 16.0), (17.0, 18.0)]])
+
+        power = layer.serialize(powers=True)['power']
+
+        self.assertEqual(tuple(power[self.H-2][0]), (3.0, 4.0))
+        self.assertEqual(tuple(power[self.H-2][1]), (5.0, 6.0))
+        self.assertEqual(tuple(power[self.H-1][0]), (9.0, 10.0))
+        self.assertEqual(tuple(power[self.H-1][1]), (11.0, 12.0))
+        self.assertEqual(sum(sum(sum(cell) for cell in row) for row in power), 3+4+5+6+9+10+11+12)
+
+    def test_apply_powers_outside(self):
+        self.world.layer_temperature.apply_powers(self.W, 0, [[1.0, 2.0]])
+        self.world.layer_temperature.apply_powers(0, -1, [[1.0, 2.0]])
+        self.assertEqual(sum(sum(row) for row in self.world.layer_temperature.serialize(powers=True)['power']), 0)
+
+    def test_log_powers_for(self):
+        self.assertEqual(self.circle.log_powers_for(self.world, 5, 4), 0.5*(1-2.0/5))
+        self.assertEqual(self.circle.log_powers_for(self.world, 19, 14), None)
+
+
+class ArraysPowerPointsTests(PowerPointsTests):
+
+    CONFIG = ArraysConfig
+
+    def test_stamp_array_cached(self):
+        self.circle.update_world(self.world)
+        stamp_array = self.circle._get_stamp_array(self.circle.get_stamp(self.world)[2], float)
+
+        self.world.layer_temperature.reset_powers()
+        self.circle.update_world(self.world)
+        self.assertTrue(self.circle._get_stamp_array(self.circle.get_stamp(self.world)[2], float) is stamp_array)
+        self.assertEqual(self.world.layer_temperature.power[4][3], 0.5)
+
+        self.circle.radius = 3
+        self.assertFalse(self.circle._get_stamp_array(self.circle.get_stamp(self.world)[2], float) is stamp_array)
+
+    def test_same_powers_as_lists(self):
+        lists_world = World(w=self.W, h=self.H, config=BaseConfig)
+
+        for world in (lists_world, self.world):
+            world.add_power_point(self.circle)
+            world.add_power_point(self.arrow)
+            world.update_powers()
+
+        self.assertEqual(self.world.layer_temperature.serialize(powers=True)['power'], lists_world.layer_temperature.serialize(powers=True)['power'])
+        self.assertEqual(self.world.layer_wetness.serialize(powers=True)['power'], lists_world.layer_wetness.serialize(powers=True)['power'])
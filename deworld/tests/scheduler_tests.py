@@ -0,0 +1,64 @@
+# coding: utf-8
+import threading
+from multiprocessing.pool import ThreadPool
+
+from unittest import TestCase
+
+from deworld.world import World
+from deworld.configs import BaseConfig
+from deworld.exceptions import DeworldException
+from deworld.layers import LAYER_TYPE
+from deworld.scheduler import Task, step_tasks, run_tasks
+
+
+class SchedulerTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.pool = ThreadPool(4)
+
+    def tearDown(self):
+        self.pool.close()
+        self.pool.join()
+
+    def task(self, name, dependencies=()):
+        def function():
+            with self.lock:
+                self.calls.append(name)
+        return Task(name=name, function=function, dependencies=dependencies)
+
+    def test_run_tasks_serial_order(self):
+        run_tasks([self.task('a'), self.task('b', ['c']), self.task('c'), self.task('d', ['a'])])
+        self.assertEqual(self.calls, ['a', 'c', 'b', 'd'])
+
+    def test_run_tasks_with_pool(self):
+        tasks = [self.task(i, [i-1] if i % 3 else []) for i in xrange(30)]
+        run_tasks(tasks, pool=self.pool)
+
+        self.assertEqual(sorted(self.calls), range(30))
+        for i in xrange(30):
+            if i % 3:
+                self.assertTrue(self.calls.index(i-1) < self.calls.index(i))
+
+    def test_run_tasks_unknown_dependency(self):
+        self.assertRaises(DeworldException, run_tasks, [self.task('a', ['b'])])
+
+    def test_run_tasks_cycle(self):
+        self.assertRaises(DeworldException, run_tasks, [self.task('a', ['b']), self.task('b', ['a'])])
+        self.assertRaises(DeworldException, run_tasks, [self.task('a', ['b']), self.task('b', ['a'])], pool=self.pool)
+
+    def test_run_tasks_exception(self):
+        def broken():
+            raise ZeroDivisionError()
+        self.assertRaises(ZeroDivisionError, run_tasks, [self.task('a'), Task(name='b', function=broken)], pool=self.pool)
+
+    def test_step_tasks(self):
+        world = World(w=5, h=5, config=BaseConfig)
+        tasks = dict((task.name, task) for task in step_tasks(world.layers))
+
+        self.assertEqual(len(tasks), 14)
+        self.assertEqual(tasks[('sync', LAYER_TYPE.HEIGHT)].dependencies, frozenset())
+        self.assertEqual(tasks[('apply', LAYER_TYPE.WIND)].dependencies, frozenset([('sync', LAYER_TYPE.WIND),
+                                                                                    ('sync', LAYER_TYPE.SOIL),
+                                                                                    ('sync', LAYER_TYPE.ATMOSPHERE)]))
@@ -0,0 +1,198 @@
+# coding: utf-8
+import os
+import copy
+import StringIO
+import random
+import shutil
+import tempfile
+
+import mock
+import numpy as np
+
+from unittest import TestCase
+
+from deworld.world import World
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld.layers.atmosphere_layer import AtmospherePoint
+from deworld.exceptions import DeworldException
+from deworld import snapshots
+
+
+class SnapshotsTests(TestCase):
+
+    W = 13
+    H = 9
+
+    CONFIG = BaseConfig
+
+    def setUp(self):
+        self.catalog = tempfile.mkdtemp()
+        self.filename = os.path.join(self.catalog, 'world.snapshot')
+
+        self.world = World(w=self.W, h=self.H, config=self.CONFIG, seed=3)
+
+        random.seed(3)
+
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                self.world.layer_height.data[y][x] = random.uniform(-1, 1)
+                self.world.layer_height.power[y][x] = (random.uniform(0, 1), random.uniform(0, 1))
+                self.world.layer_temperature.data[y][x] = random.uniform(0, 1)
+                self.world.layer_wind.data[y][x] = (random.uniform(-1, 1), random.uniform(-1, 1))
+                self.world.layer_vegetation.data[y][x] = random.randint(0, 2)
+                self.world.layer_atmosphere.data[y][x] = AtmospherePoint(wind=(random.uniform(-1, 1), random.uniform(-1, 1)),
+                                                                         temperature=random.uniform(0, 1),
+                                                                         wetness=random.uniform(0, 1))
+
+        self.world.do_step()
+
+    def tearDown(self):
+        shutil.rmtree(self.catalog)
+
+    def test_save_load(self):
+        snapshots.save_snapshot(self.world, self.filename, powers=True)
+
+        for config in (BaseConfig, ArraysConfig):
+            world = snapshots.load_snapshot(self.filename, config=config)
+            self.assertEqual((world.seed, world.turn), (self.world.seed, self.world.turn))
+            self.assertEqual(world, self.world)
+            self.assertFalse(world.powers_outdated)
+
+            for layer, expected_layer in zip(world.layers, self.world.layers)[:-1]:
+                self.assertTrue(np.array_equal(layer.serialize(powers=True)['power'], expected_layer.serialize(powers=True)['power']))
+
+    def test_save_load_without_powers(self):
+        snapshots.save_snapshot(self.world, self.filename)
+
+        with open(self.filename, 'rb') as snapshot_file:
+            header = snapshots._read_header(snapshot_file)
+
+        self.assertEqual(set(description['grid'] for description in header['arrays']), set(['data']))
+
+        world = snapshots.load_snapshot(self.filename, config=self.CONFIG)
+        self.assertEqual(world, self.world)
+        self.assertTrue(world.powers_outdated)
+
+    def test_load_memmap(self):
+        snapshots.save_snapshot(self.world, self.filename)
+
+        world = snapshots.load_snapshot(self.filename, config=ArraysConfig)
+
+        self.assertTrue(isinstance(world.layer_height.data, np.memmap))
+        self.assertTrue(isinstance(world.layer_atmosphere.data.channels, np.memmap))
+        self.assertEqual(world.layer_height.data.dtype.str, '<f8')
+
+    def test_load_without_copies(self):
+        snapshots.save_snapshot(self.world, self.filename, powers=True)
+
+        with mock.patch('deworld.layers.base_layer.BaseLayer._copy_grid', mock.Mock(side_effect=lambda grid: grid)) as copy_grid:
+            world = snapshots.load_snapshot(self.filename, config=ArraysConfig)
+
+        # only powers of atmosphere are not stored in snapshot
+        self.assertEqual(copy_grid.call_count, 1)
+        self.assertTrue(isinstance(world.layer_height.power, np.memmap))
+
+    def test_steps_after_load(self):
+        snapshots.save_snapshot(self.world, self.filename)
+
+        world = snapshots.load_snapshot(self.filename, config=self.CONFIG)
+
+        world.do_step()
+        world.do_step()
+        self.world.do_step()
+        self.world.do_step()
+
+        self.assertEqual(world.serialize(), self.world.serialize())
+
+        # copy-on-write mode does not change file
+        self.assertEqual(snapshots.load_snapshot(self.filename, config=self.CONFIG).turn, 1)
+
+    def test_read_only(self):
+        snapshots.save_snapshot(self.world, self.filename)
+
+        world = snapshots.load_snapshot(self.filename, config=ArraysConfig, mode='r')
+
+        self.assertRaises(ValueError, world.layer_height.data.__setitem__, (0, 0), 0.5)
+        self.assertRaises(DeworldException, world.do_step)
+        self.assertEqual(world.turn, self.world.turn)
+
+    def test_wrong_file(self):
+        with open(self.filename, 'wb') as snapshot_file:
+            snapshot_file.write('{"w": 1, "h": 1}')
+
+        self.assertRaises(DeworldException, snapshots.load_snapshot, self.filename, config=self.CONFIG)
+
+    def test_wrong_version(self):
+        snapshots.save_snapshot(self.world, self.filename)
+
+        with open(self.filename, 'r+b') as snapshot_file:
+            snapshot_file.seek(len(snapshots.MAGIC))
+            snapshot_file.write('\xff')
+
+        self.assertRaises(DeworldException, snapshots.load_snapshot, self.filename, config=self.CONFIG)
+
+
+    def test_delta(self):
+        base_world = World.deserialize(config=self.CONFIG, data=copy.deepcopy(self.world.serialize(powers=True)))
+
+        self.world.do_step()
+        self.world.layer_vegetation.data[3][4] = 2
+
+        delta = snapshots.create_delta(base_world, self.world, powers=True)
+
+        for config in (BaseConfig, ArraysConfig):
+            world = World.deserialize(config=config, data=copy.deepcopy(base_world.serialize(powers=True)))
+            snapshots.apply_delta(world, delta)
+
+            self.assertEqual(world.turn, self.world.turn)
+            self.assertEqual(world, self.world)
+            self.assertFalse(world.powers_outdated)
+
+            for layer, expected_layer in zip(world.layers, self.world.layers)[:-1]:
+                self.assertTrue(np.array_equal(layer.serialize(powers=True)['power'], expected_layer.serialize(powers=True)['power']))
+
+    def test_delta_without_powers(self):
+        base_world = World.deserialize(config=self.CONFIG, data=copy.deepcopy(self.world.serialize(powers=True)))
+
+        self.world.do_step()
+
+        snapshots.apply_delta(base_world, snapshots.create_delta(base_world, self.world))
+
+        self.assertEqual(base_world, self.world)
+        self.assertTrue(base_world.powers_outdated)
+
+    def test_delta_only_changed_cells(self):
+        base_world = World.deserialize(config=self.CONFIG, data=copy.deepcopy(self.world.serialize()))
+
+        self.world.layer_height.data[3][4] = 0.125
+        self.world.layer_atmosphere.data[5][6] = AtmospherePoint(wind=(0.5, 0.5), temperature=0.75, wetness=0.3)
+
+        delta = snapshots.create_delta(base_world, self.world)
+
+        header = snapshots._read_header(StringIO.StringIO(delta), expected_magic=snapshots.DELTA_MAGIC)
+
+        self.assertEqual(sorted((description['layer'], description['grid']) for description in header['arrays'] if description['cells_number']),
+                         [('atmosphere', 'data'), ('height', 'data')])
+
+        # uint32 index & values of every changed cell
+        self.assertEqual(len(delta) - header['data_start'], 4 + 8 + 4 + 4*8)
+
+        snapshots.apply_delta(base_world, delta)
+        self.assertEqual(base_world, self.world)
+
+    def test_delta_wrong_turn(self):
+        base_world = World.deserialize(config=self.CONFIG, data=copy.deepcopy(self.world.serialize()))
+        self.world.do_step()
+
+        delta = snapshots.create_delta(base_world, self.world)
+
+        self.assertRaises(DeworldException, snapshots.apply_delta, self.world, delta)
+
+    def test_delta_wrong_size(self):
+        base_world = World(w=self.W+1, h=self.H, config=self.CONFIG)
+        self.assertRaises(DeworldException, snapshots.create_delta, base_world, self.world)
+
+
+class ArraysSnapshotsTests(SnapshotsTests):
+
+    CONFIG = ArraysConfig
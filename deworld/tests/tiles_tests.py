@@ -0,0 +1,85 @@
+# coding: utf-8
+import random
+
+from unittest import TestCase
+
+from deworld.world import World
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld.layers import LAYER_TYPE
+from deworld.tiles import TiledStepper
+from deworld.exceptions import DeworldException
+from deworld import power_points, normalizers
+
+
+class TiledStepperTests(TestCase):
+
+    W = 37
+    H = 29
+
+    def create_world(self):
+        world = World(w=self.W, h=self.H, config=ArraysConfig, seed=1)
+
+        world.add_power_point(power_points.CircleAreaPoint(layer_type=LAYER_TYPE.HEIGHT,
+                                                           name='height',
+                                                           x=10,
+                                                           y=12,
+                                                           power=(0.0, 0.75),
+                                                           radius=8,
+                                                           normalizer=normalizers.linear_2,
+                                                           default_power=(0.0, 0.0)))
+        world.add_power_point(power_points.CircleAreaPoint(layer_type=LAYER_TYPE.TEMPERATURE,
+                                                           name='temperature',
+                                                           x=25,
+                                                           y=10,
+                                                           power=0.9,
+                                                           radius=15,
+                                                           normalizer=normalizers.linear))
+        world.add_power_point(power_points.CircleAreaPoint(layer_type=LAYER_TYPE.VEGETATION,
+                                                           name='vegetation',
+                                                           x=18,
+                                                           y=14,
+                                                           power=(0.3, 0.3),
+                                                           radius=20,
+                                                           normalizer=normalizers.equal,
+                                                           default_power=(0.0, 0.0)))
+        return world
+
+    def setUp(self):
+        self.world = self.create_world()
+        self.stepper = None
+
+    def tearDown(self):
+        if self.stepper is not None:
+            self.stepper.close()
+
+    def test_lists_storage(self):
+        self.assertRaises(DeworldException, TiledStepper, World(w=self.W, h=self.H, config=BaseConfig))
+
+    def test_read_only_world(self):
+        self.world.read_only = True
+        self.assertRaises(DeworldException, TiledStepper, self.world)
+
+    def test_halo(self):
+        self.stepper = TiledStepper(self.world, tile_size=10, processes=2)
+        self.assertEqual(self.stepper.halo, self.world.layer_atmosphere.DELTA + self.world.layer_atmosphere.MAX_WIND_SPEED + 1)
+        self.assertEqual(len(self.stepper.tiles), 12)
+
+    def test_same_steps_as_world(self):
+        expected_world = self.create_world()
+
+        self.stepper = TiledStepper(self.world, tile_size=10, processes=3)
+
+        random.seed(5)
+        for i in xrange(5):
+            expected_world.do_step()
+
+        random.seed(5)
+        for i in xrange(5):
+            self.stepper.do_step()
+
+        self.assertEqual(self.world.serialize(), expected_world.serialize())
+
+    def test_resized_world(self):
+        self.stepper = TiledStepper(self.world, tile_size=10, processes=2)
+        self.world.resize(self.W+2, self.H+2)
+        self.assertRaises(DeworldException, self.stepper.do_step)
@@ -2,7 +2,10 @@
 
 from unittest import TestCase
 
-from deworld.utils import E, prepair_to_approximation, resize2d, shift2d
+import numpy as np
+
+from deworld.utils import E, prepair_to_approximation, resize2d, shift2d, resize_array, shift_array, box_sum, downsample_array, counter_random, counter_random_array
+from deworld.utils import counter_random_state, counter_random_from, counter_random_array_from
 
 class UtilsTests(TestCase):
 
@@ -91,3 +94,70 @@ class UtilsTests(TestCase):
                  [5, 6, 7, 8, 9],
                  [6, 7, 8, 9, 0]]
         self.assertEqual(shift2d(array, dx=0, dy=0), array)
+
+    def test_resize_array_as_resize2d(self):
+        array = [[1, 2 ,3],
+                 [4, 5, 6]]
+        for new_w, new_h in ((5, 6), (3, 6), (2, 1), (3, 2)):
+            self.assertEqual(resize_array(np.array(array), new_w, new_h).tolist(), resize2d(array, new_w, new_h))
+
+    def test_shift_array_as_shift2d(self):
+        array = [[1, 2, 3, 4, 5],
+                 [2, 3, 4, 5, 6],
+                 [3, 4, 5, 6, 7]]
+        for dx, dy in ((3, 2), (0, 0), (-1, 1), (1, -2)):
+            self.assertEqual(shift_array(np.array(array), dx=dx, dy=dy).tolist(), shift2d(array, dx=dx, dy=dy))
+
+    def test_box_sum(self):
+        array = np.arange(20, dtype=float).reshape((4, 5))
+        sums = box_sum(array, 1)
+        for y in xrange(4):
+            for x in xrange(5):
+                self.assertEqual(sums[y][x], array[max(0, y-1):y+2, max(0, x-1):x+2].sum())
+
+    def test_box_sum_with_channels(self):
+        array = np.arange(24, dtype=float).reshape((3, 4, 2))
+        sums = box_sum(array, 2)
+        self.assertEqual(sums.shape, (3, 4, 2))
+        self.assertEqual(sums[1][1].tolist(), array.sum(axis=(0, 1)).tolist())
+
+    def test_downsample_array(self):
+        array = np.arange(20, dtype=float).reshape((4, 5))
+        means = downsample_array(array, 2)
+        self.assertEqual(means.shape, (2, 3))
+        for y in xrange(2):
+            for x in xrange(3):
+                self.assertEqual(means[y][x], array[y*2:y*2+2, x*2:x*2+2].mean())
+
+    def test_downsample_array_with_channels(self):
+        array = np.arange(24, dtype=float).reshape((3, 4, 2))
+        means = downsample_array(array, 3)
+        self.assertEqual(means.shape, (1, 2, 2))
+        self.assertEqual(means[0][1].tolist(), array[:, 3:].mean(axis=(0, 1)).tolist())
+
+    def test_downsample_array_mode(self):
+        array = np.array([[0, 1, 2, 2],
+                          [1, 1, 2, 0],
+                          [2, 2, 0, 0]])
+        self.assertEqual(downsample_array(array, 2, mode=True).tolist(), [[1, 2], [2, 0]])
+
+    def test_downsample_array_without_downsampling(self):
+        array = np.arange(6).reshape((2, 3))
+        self.assertTrue(downsample_array(array, 1) is array)
+
+    def test_counter_random(self):
+        self.assertEqual(counter_random(1, 2, 3), counter_random(1, 2, 3))
+        self.assertNotEqual(counter_random(1, 2, 3), counter_random(1, 3, 2))
+        self.assertTrue(all(0 <= counter_random(7, i) < 1 for i in xrange(1000)))
+
+    def test_counter_random_array_as_counter_random(self):
+        xs = np.arange(-10, 10)
+        self.assertEqual(counter_random_array(5, xs, 2).tolist(), [counter_random(5, x, 2) for x in xrange(-10, 10)])
+        self.assertEqual(counter_random_array(5, 1, 2), counter_random(5, 1, 2))
+
+    def test_counter_random_from_state(self):
+        state = counter_random_state((5, 1))
+        keys = np.arange(-10, 10) << 32
+
+        self.assertEqual(counter_random_from(state, 2), counter_random(5, 1, 2))
+        self.assertEqual(counter_random_array_from(state, keys).tolist(), [counter_random(5, 1, key) for key in keys.tolist()])
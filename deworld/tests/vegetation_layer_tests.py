@@ -1,11 +1,13 @@
 # coding: utf-8
+import random
+
 import mock
 
 from unittest import TestCase
 
 from deworld.world import World
 from deworld.layers import VEGETATION_TYPE
-from deworld.configs import BaseConfig
+from deworld.configs import BaseConfig, ArraysConfig
 
 
 class VegetationLayerTests(TestCase):
@@ -53,6 +55,66 @@ class VegetationLayerTests(TestCase):
     def test_can_spawn_with_probability(self):
         spawned = False
         for i in xrange(1000):
+            self.world.turn = i
             spawned = spawned or self.layer.can_spawn(5, 5, [VEGETATION_TYPE.FOREST])
 
         self.assertTrue(spawned)
+
+    def test_reproducible_per_seed(self):
+        results = []
+        for seed in (1, 1, 2):
+            world = World(w=self.W, h=self.H, config=BaseConfig, seed=seed)
+            for y in xrange(self.H):
+                for x in xrange(self.W):
+                    world.layer_vegetation.power[y][x] = (0.1, 0.17)
+                    world.layer_height.data[y][x] = 0.0
+                    world.layer_temperature.data[y][x] = 0.5
+                    world.layer_wetness.data[y][x] = 0.5
+            world.layer_vegetation.sync()
+            results.append(world.layer_vegetation.next_data)
+
+        self.assertEqual(results[0], results[1])
+        self.assertNotEqual(results[0], results[2])
+
+
+class ArraysVegetationLayerTests(TestCase):
+
+    W = 17
+    H = 13
+
+    def test_sync_as_lists(self):
+        lists_world = World(w=self.W, h=self.H, config=BaseConfig, seed=3, turn=7)
+        arrays_world = World(w=self.W, h=self.H, config=ArraysConfig, seed=3, turn=7)
+        hashed_world = World(w=self.W, h=self.H, config=BaseConfig, seed=3, turn=7)
+
+        random.seed(2)
+
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                vegetation = random.choice([VEGETATION_TYPE.DESERT, VEGETATION_TYPE.GRASS, VEGETATION_TYPE.FOREST])
+                power = (random.uniform(0, 0.3), random.uniform(0, 0.3))
+                height = random.uniform(0.3, 0.9)
+                temperature = random.uniform(0.8, 1.0)
+                wetness = random.uniform(0.0, 0.3)
+
+                for world in (lists_world, arrays_world, hashed_world):
+                    world.layer_vegetation.data[y][x] = vegetation
+                    world.layer_vegetation.power[y][x] = power
+                    world.layer_height.data[y][x] = height
+                    world.layer_temperature.data[y][x] = temperature
+                    world.layer_wetness.data[y][x] = wetness
+
+        lists_world.layer_vegetation.sync()
+        arrays_world.layer_vegetation.sync()
+
+        # without numpy random numbers are calculated for every cell separately
+        with mock.patch('deworld.layers.vegetation_layer.np', None):
+            hashed_world.layer_vegetation.sync()
+
+        self.assertEqual(hashed_world.layer_vegetation.next_data, lists_world.layer_vegetation.next_data)
+        self.assertEqual(hashed_world.layer_vegetation.power, lists_world.layer_vegetation.power)
+        self.assertEqual(lists_world.layer_vegetation._random_grids, None)
+
+        self.assertEqual(arrays_world.layer_vegetation.next_data.tolist(), lists_world.layer_vegetation.next_data)
+        self.assertEqual(arrays_world.layer_vegetation.power.tolist(), [[list(power) for power in row] for row in lists_world.layer_vegetation.power])
+        self.assertEqual(len(set(sum(lists_world.layer_vegetation.next_data, []))), 3)
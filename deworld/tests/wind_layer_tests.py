@@ -1,11 +1,14 @@
 # coding: utf-8
+import random
+
 import mock
 
 from unittest import TestCase
 
 from deworld.world import World
 from deworld.utils import E
-from deworld.configs import BaseConfig
+from deworld.configs import BaseConfig, ArraysConfig
+
 
 class WindLayerTests(TestCase):
 
@@ -158,3 +161,65 @@ class WindLayerTests(TestCase):
 
         v_speed, h_speed = self.layer._get_speeds(from_x=6, from_y=6, to_x=5, to_y=5)
         self.assertTrue(v_speed < 0 and h_speed < 0)
+
+
+class ArraysWindLayerTests(TestCase):
+
+    W = 17
+    H = 11
+
+    def setUp(self):
+        self.world = World(w=self.W, h=self.H, config=ArraysConfig)
+        self.layer = self.world.layer_wind
+
+        random.seed(2)
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                self.world.layer_temperature.data[y][x] = random.uniform(0, 1)
+                self.world.layer_height.data[y][x] = random.uniform(-1, 1)
+
+    def check_calculate_winds(self):
+        winds = self.layer._calculate_winds()
+
+        for y in xrange(self.world.h):
+            for x in xrange(self.world.w):
+                self.assertEqual(tuple(winds[y][x]), self.layer._calculate_wind(x, y))
+
+    def test_calculate_winds(self):
+        self.check_calculate_winds()
+
+    def test_calculate_winds_small_world(self):
+        self.world.resize(2, 3)
+        self.check_calculate_winds()
+
+    def test_kernel_recalculated_on_delta_change(self):
+        self.assertEqual(len(self.layer._get_kernel()), (2*self.layer.DELTA+1)**2)
+        self.layer.DELTA = 1
+        self.assertEqual(len(self.layer._get_kernel()), 9)
+        self.check_calculate_winds()
+
+    def check_smooth_winds(self):
+        for y in xrange(self.world.h):
+            for x in xrange(self.world.w):
+                self.layer.data[y][x] = (0.0, 0.0) if random.uniform(0, 1) < 0.5 else (random.uniform(-1, 1), random.uniform(-1, 1))
+                self.layer.next_data[y][x] = (0.0, 0.0) if random.uniform(0, 1) < 0.7 else (random.uniform(-1, 1), random.uniform(-1, 1))
+
+        winds = self.layer._smooth_winds()
+
+        for y in xrange(self.world.h):
+            for x in xrange(self.world.w):
+                v_speed, h_speed = self.layer._smooth_wind(x, y)
+                self.assertAlmostEqual(winds[y][x][0], v_speed, places=12)
+                self.assertAlmostEqual(winds[y][x][1], h_speed, places=12)
+
+    def test_smooth_winds(self):
+        self.check_smooth_winds()
+
+    def test_smooth_winds_small_world(self):
+        self.world.resize(2, 3)
+        self.check_smooth_winds()
+
+    @mock.patch('deworld.layers.WindLayer.BORDER_SPEED', 0.0)
+    def test_smooth_winds_calm_borders(self):
+        self.layer.BORDER_SPEED = 0.0
+        self.check_smooth_winds()
@@ -1,11 +1,35 @@
 # coding: utf-8
+import json
 import random
+import StringIO
+
+import mock
+
+import numpy as np
 
 from unittest import TestCase
 
-from deworld.world import World
-from deworld.configs import BaseConfig
+from deworld.world import World, CellInfo
+from deworld.configs import BaseConfig, ArraysConfig
+from deworld.exceptions import DeworldException
 from deworld.layers.atmosphere_layer import AtmospherePoint
+from deworld.power_points import CircleAreaPoint
+from deworld import normalizers
+
+
+class TemperatureBiom(object):
+
+    def __init__(self, temperature):
+        self.temperature = temperature
+
+    def check(self, cell):
+        return -abs(cell.temperature - self.temperature)
+
+
+class ArraysTemperatureBiom(TemperatureBiom):
+
+    def check_arrays(self, cells):
+        return -np.fabs(cells.temperature - self.temperature)
 
 
 class WorldTests(TestCase):
@@ -13,11 +37,16 @@ class WorldTests(TestCase):
     W = 10
     H = 10
 
+    CONFIG = BaseConfig
+
     def setUp(self):
 
-        self.world = World(w=self.W, h=self.H, config=BaseConfig)
+        self.world = World(w=self.W, h=self.H, config=self.CONFIG)
         self.layer = self.world.layer_vegetation
 
+    def tearDown(self):
+        self.world.close()
+
     def test_simple_step(self):
         self.world.do_step()
 
@@ -40,9 +69,285 @@ class WorldTests(TestCase):
         self.world.layer_wetness.data[5][5] = 5
         self.world.layer_vegetation.data[5][5] = 1
 
-        self.assertEqual(self.world, World.deserialize(config=BaseConfig, data=self.world.serialize()))
+        self.assertEqual(self.world, World.deserialize(config=self.CONFIG, data=self.world.serialize()))
+        self.world.do_step()
+
+    def test_run(self):
+        steps = []
+        self.world.run(7, callback=lambda step, world: steps.append((step, world)), every=3)
+        self.assertEqual(steps, [(3, self.world), (6, self.world)])
+
+    def test_seed_not_from_global_random(self):
+        random.seed(1)
+        expected_value = random.random()
+
+        random.seed(1)
+        world_1 = World(w=self.W, h=self.H, config=self.CONFIG)
+        self.assertEqual(random.random(), expected_value)
+
+        random.seed(1)
+        world_2 = World(w=self.W, h=self.H, config=self.CONFIG)
+        self.assertNotEqual(world_1.seed, world_2.seed)
+
+    def test_layers_positional_arguments(self):
+        data = self.world.serialize()
+        world = World(self.W, self.H, self.CONFIG, data['layers']['height'], data['layers']['temperature'])
+        self.assertEqual(world.layer_height, self.world.layer_height)
+
+    def test_run_wrong_every(self):
+        self.assertRaises(DeworldException, self.world.run, 3, callback=lambda step, world: None, every=0)
+        self.assertRaises(DeworldException, self.world.run, 3, every=-1)
+        self.assertEqual(self.world.turn, 0)
+
+    def test_run_same_as_do_step(self):
+        world = World(w=self.W, h=self.H, config=self.CONFIG, seed=self.world.seed)
+
+        for test_world in (world, self.world):
+            test_world.layer_height.data[3][4] = 0.7
+            test_world.layer_temperature.data[6][2] = 0.9
+
+        random.seed(1)
+        for i in xrange(3):
+            world.do_step()
+
+        random.seed(1)
+        self.world.run(3)
+
+        self.assertEqual(self.world.serialize(), world.serialize())
+
+    def test_apply_swaps_buffers(self):
+        data = self.layer.data
+        next_data = self.layer.next_data
+        power = self.layer.power
+
+        self.world.do_step()
+
+        self.assertTrue(self.layer.data is next_data)
+        self.assertTrue(self.layer.next_data is data)
+        self.assertTrue(self.layer.power is power)
+
+    def test_biomes_map(self):
+        cold, warm, hot, also_hot = TemperatureBiom(0.0), ArraysTemperatureBiom(0.5), TemperatureBiom(1.0), ArraysTemperatureBiom(1.0)
+
+        for biom in (cold, warm, hot, also_hot):
+            self.world.add_biom(biom)
+
+        for x in xrange(self.W):
+            self.world.layer_temperature.data[0][x] = 0.1
+            self.world.layer_temperature.data[1][x] = 0.45
+            self.world.layer_temperature.data[2][x] = 0.9
+
+        biomes_indexes = self.world.get_biomes_indexes()
+        biomes_map = self.world.get_biomes_map()
+
+        self.assertEqual(list(biomes_indexes[0]), [0] * self.W)
+        self.assertEqual(list(biomes_indexes[1]), [1] * self.W)
+        self.assertEqual(list(biomes_indexes[2]), [2] * self.W)
+
+        self.assertEqual(biomes_map[0], [cold] * self.W)
+        self.assertEqual(biomes_map[1], [warm] * self.W)
+        self.assertEqual(biomes_map[2], [hot] * self.W)
+        self.assertEqual(biomes_map[3], [warm] * self.W)
+
+    def test_biomes_map_without_biomes(self):
+        self.assertEqual(self.world.get_biomes_map(), [[None] * self.W for y in xrange(self.H)])
+
+    def test_biomes_indexes_array(self):
+        biomes_indexes = self.world.get_biomes_indexes()
+
+        self.assertTrue(isinstance(biomes_indexes, np.ndarray))
+        self.assertEqual(biomes_indexes.dtype.kind, 'i')
+        self.assertEqual(biomes_indexes.tolist(), [[-1] * self.W for y in xrange(self.H)])
+
+    def test_biomes_indexes_without_numpy(self):
+        # arrays storage can not be used without numpy
+        if self.world.layer_height.use_arrays:
+            return
+
+        with mock.patch('deworld.world.np', None):
+            self.assertEqual(self.world.get_biomes_indexes(), [[-1] * self.W for y in xrange(self.H)])
+            self.assertEqual(self.world.get_biomes_map(), [[None] * self.W for y in xrange(self.H)])
+
+    def fill_world(self):
+        random.seed(2)
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                self.world.layer_height.data[y][x] = random.uniform(-1, 1)
+                self.world.layer_height.power[y][x] = (random.uniform(-1, 1), random.uniform(-1, 1))
+                self.world.layer_wind.data[y][x] = (random.uniform(-1, 1), random.uniform(-1, 1))
+                self.world.layer_vegetation.data[y][x] = random.randint(0, 2)
+                self.world.layer_atmosphere.data[y][x] = AtmospherePoint(wind=(random.uniform(-1, 1), random.uniform(-1, 1)),
+                                                                         temperature=random.uniform(0, 1),
+                                                                         wetness=random.uniform(0, 1))
+        self.world.do_step()
+
+    def check_dump_load(self, compressed, powers=False):
+        self.fill_world()
+
+        fileobj = StringIO.StringIO()
+        self.world.dump(fileobj, compressed=compressed, powers=powers)
+
+        for config in (BaseConfig, ArraysConfig):
+            world = World.load(StringIO.StringIO(fileobj.getvalue()), config=config, compressed=compressed)
+
+            self.assertEqual((world.w, world.h, world.seed, world.turn), (self.world.w, self.world.h, self.world.seed, self.world.turn))
+            self.assertEqual(world, self.world)
+            self.assertEqual(world.powers_outdated, not powers)
+
+            if powers:
+                for layer, expected_layer in zip(world.layers, self.world.layers)[:-1]:
+                    self.assertTrue(np.array_equal(layer.serialize(powers=True)['power'], expected_layer.serialize(powers=True)['power']))
+
+            world.do_step()
+
+        return fileobj.getvalue()
+
+    def test_dump_load(self):
+        data = self.check_dump_load(compressed=False)
+        self.assertEqual(len(data.splitlines()), 1 + len(self.world.layers) * (1 + self.H))
+
+    def test_dump_load_with_powers(self):
+        data = self.check_dump_load(compressed=False, powers=True)
+        self.assertEqual(len(data.splitlines()), 1 + (len(self.world.layers)*2 - 1) * (1 + self.H))
+
+    def test_dump_load_compressed(self):
+        self.check_dump_load(compressed=True)
+
+    def test_serialize_without_powers(self):
+        self.assertFalse(any('power' in layer_data for layer_data in self.world.serialize(powers=False)['layers'].values()))
+        self.assertTrue(all('power' in layer_data for layer_data in self.world.serialize()['layers'].values()))
+
+        self.assertTrue(World.deserialize(config=self.CONFIG, data=self.world.serialize(powers=False)).powers_outdated)
+        self.assertFalse(World.deserialize(config=self.CONFIG, data=self.world.serialize()).powers_outdated)
+
+    def test_check_loaded_powers(self):
+        loaded_grids = set((layer_name, 'power') for layer_name, layer in self.world.named_layers())
+
+        self.world.check_loaded_powers(loaded_grids)
+        self.assertFalse(self.world.powers_outdated)
+
+        self.world.check_loaded_powers(loaded_grids - set([('soil', 'power')]))
+        self.assertTrue(self.world.powers_outdated)
+
+        self.world.check_loaded_powers(loaded_grids)
+        self.assertTrue(self.world.powers_outdated)
+
+    def test_powers_recalculated_lazily(self):
+        circle = CircleAreaPoint(layer_type=self.world.layer_temperature.TYPE, name='circle', x=3, y=4, power=0.5, radius=5, normalizer=normalizers.linear)
+        self.world.add_power_point(circle)
+
+        world = World.deserialize(config=self.CONFIG, data=self.world.serialize(powers=False))
+        world.add_power_point(circle)
+
+        self.assertEqual(world.layer_temperature.power[4][3], 0.0)
+        self.assertEqual(world.cell_power_info(3, 4).temperature, 0.5)
+        self.assertFalse(world.powers_outdated)
+
+    def test_load_wrong_format(self):
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO('{"w": 1, "h": 1}\n'), config=self.CONFIG)
+
+    def test_load_broken_stream(self):
+        fileobj = StringIO.StringIO()
+        self.world.dump(fileobj)
+        data = fileobj.getvalue()
+
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO(data[:len(data) / 2]), config=self.CONFIG)
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO(data.replace('[', '{', 1)), config=self.CONFIG)
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO('garbage'), config=self.CONFIG)
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO('garbage'), config=self.CONFIG, compressed=True)
+
+        fileobj = StringIO.StringIO()
+        self.world.dump(fileobj, compressed=True)
+        data = fileobj.getvalue()
+
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO(data[:-10]), config=self.CONFIG, compressed=True)
+
+    def test_load_truncated_between_grids(self):
+        fileobj = StringIO.StringIO()
+        self.world.dump(fileobj)
+        lines = fileobj.getvalue().splitlines(True)
+
+        # header and grids of height and temperature
+        data = ''.join(lines[:1 + 2 * (1 + self.H)])
+
+        self.assertRaises(DeworldException, World.load, StringIO.StringIO(data), config=self.CONFIG)
+
+    def test_deserialize_without_layer(self):
+        data = self.world.serialize()
+        del data['layers']['height']
+
+        self.assertRaises(DeworldException, World.deserialize, config=self.CONFIG, data=data)
+
+    def test_deserialize_without_soil(self):
+        data = self.world.serialize()
+        del data['layers']['soil']
+
+        self.assertEqual(World.deserialize(config=self.CONFIG, data=data).layer_height, self.world.layer_height)
+
+    def test_deserialize_wrong_shape(self):
+        data = self.world.serialize()
+        data['layers']['height']['data'] = data['layers']['height']['data'][:-1]
+
+        self.assertRaises(DeworldException, World.deserialize, config=self.CONFIG, data=data)
+
+    def test_cell_view_live(self):
+        cell = self.world.cell_view(5, 5)
+
+        self.world.layer_temperature.data[5][5] = 0.25
+        self.world.layer_atmosphere.data[5][5] = AtmospherePoint(wind=(0.5, 0.5), temperature=0.75, wetness=0.3)
+
+        self.assertEqual(cell.temperature, 0.25)
+        self.assertEqual(cell.atmo_temperature, 0.75)
+        self.assertEqual(cell.mid_temperature, 0.5)
+        self.assertFalse(hasattr(cell, '__dict__'))
+
+        self.assertEqual(cell, self.world.cell_info(5, 5))
+        self.assertEqual(cell, self.world.cell_view(5, 5))
+        self.assertNotEqual(cell, self.world.cell_view(5, 6))
+        self.assertRaises(TypeError, hash, cell)
+
+    def test_cell_info_as_tuple(self):
+        self.world.layer_temperature.data[5][5] = 0.25
+        self.world.layer_wind.data[5][5] = (0.5, -0.5)
+
+        info = self.world.cell_info(5, 5)
+
+        self.assertTrue(isinstance(info, CellInfo))
+        self.assertEqual(info[1], 0.25)
+        self.assertEqual(info.wind, (0.5, -0.5))
+        self.assertEqual(info, self.world.cell_view(5, 5).info())
+
+        height, temperature, wind, wetness, vegetation, soil, atmo_wind, atmo_temperature, atmo_wetness = info
+        self.assertEqual(temperature, 0.25)
+
+    def test_cell_info_snapshot(self):
+        self.world.layer_temperature.data[5][5] = 0.5
+
+        info = self.world.cell_info(5, 5)
+
+        self.world.layer_temperature.data[5][5] = 0.9
         self.world.do_step()
 
+        self.assertEqual(info.temperature, 0.5)
+
+    def test_cell_info_cache(self):
+        cell = self.world.cell_info(5, 5)
+        self.assertTrue(self.world.cell_info(5, 5) is cell)
+        self.assertFalse(self.world.cell_info(5, 6) is cell)
+
+        self.world.do_step()
+        self.assertFalse(self.world.cell_info(5, 5) is cell)
+
+        cell = self.world.cell_info(5, 5)
+        self.world.resize(self.world.w+2, self.world.h+2)
+        self.assertFalse(self.world.cell_info(5, 5) is cell)
+
+    @mock.patch('deworld.world.CELLS_CACHE_SIZE', 3)
+    def test_cell_info_cache_size(self):
+        for x in xrange(5):
+            self.world.cell_info(x, 0)
+            self.assertTrue(len(self.world._cells_infos) <= 3)
+
     def test_cell_info_randomize_stability(self):
         cell = self.world.cell_info(5, 5)
         randomized_cell = cell.randomize(1, 0.5)
@@ -51,6 +356,52 @@ class WorldTests(TestCase):
             self.assertEqual(randomized_cell, cell.randomize(1, 0.5))
 
 
+    def test_randomize_cells(self):
+        random.seed(2)
+        for y in xrange(self.H):
+            for x in xrange(self.W):
+                self.world.layer_height.data[y][x] = random.uniform(-1, 1)
+                self.world.layer_wind.data[y][x] = (random.uniform(-1, 1), random.uniform(-1, 1))
+                self.world.layer_atmosphere.data[y][x] = AtmospherePoint(wind=(random.uniform(-1, 1), random.uniform(-1, 1)),
+                                                                         temperature=random.uniform(0, 1),
+                                                                         wetness=random.uniform(0, 1))
+
+        seeds = [[y * 100 + x for x in xrange(4)] for y in xrange(3)]
+
+        cells = self.world.randomize_cells(seeds, 0.5, x=2, y=5)
+
+        for y in xrange(3):
+            for x in xrange(4):
+                expected = self.world.cell_info(x+2, y+5).randomize(seeds[y][x], 0.5)
+
+                for field in ('height', 'temperature', 'wetness', 'vegetation', 'soil', 'atmo_temperature', 'atmo_wetness'):
+                    self.assertEqual(getattr(cells, field)[y][x], getattr(expected, field))
+
+                self.assertEqual(tuple(cells.wind[y][x]), expected.wind)
+                self.assertEqual(tuple(cells.atmo_wind[y][x]), expected.atmo_wind)
+
+    def test_cells_arrays_region(self):
+        self.fill_world()
+
+        cells = self.world.cells_arrays(2, 3, 4, 5)
+
+        self.assertEqual(cells.height.shape, (5, 4))
+        self.assertEqual(cells.atmo_wind.shape, (5, 4, 2))
+
+        for y in xrange(5):
+            for x in xrange(4):
+                expected = self.world.cell_info(x+2, y+3)
+                self.assertEqual(cells.vegetation[y][x], expected.vegetation)
+                self.assertEqual(cells.atmo_temperature[y][x], expected.atmo_temperature)
+                self.assertEqual(tuple(cells.wind[y][x]), tuple(expected.wind))
+
+    def test_randomize_cells_out_of_world(self):
+        seeds = [[1, 2], [3, 4]]
+        self.assertRaises(DeworldException, self.world.randomize_cells, seeds, 0.5, x=self.W-1, y=0)
+        self.assertRaises(DeworldException, self.world.randomize_cells, seeds, 0.5, x=0, y=self.H-1)
+        self.assertRaises(DeworldException, self.world.randomize_cells, seeds, 0.5, x=-1, y=0)
+        self.assertEqual(self.world.randomize_cells(seeds, 0.5, x=self.W-2, y=self.H-2).height.shape, (2, 2))
+
     def test_cell_info_randomize_random_state_restore(self):
         random.seed(1)
 
@@ -63,3 +414,91 @@ class WorldTests(TestCase):
         cell.randomize(1, 0.5)
 
         self.assertEqual(test_list, [random.randint(-100, 100) for i in xrange(100)])
+
+
+class ArraysWorldTests(WorldTests):
+
+    CONFIG = ArraysConfig
+
+    def assertWorldsAlmostEqual(self, world_1, world_2):
+        layers_1 = world_1.serialize()['layers']
+        layers_2 = world_2.serialize()['layers']
+
+        for layer_name in ('height', 'temperature', 'wind', 'wetness', 'vegetation', 'soil'):
+            self.assertTrue(np.allclose(layers_1[layer_name]['data'], layers_2[layer_name]['data'], rtol=0, atol=1e-12), layer_name)
+
+        atmosphere_1 = [[(p[0][0], p[0][1], p[1], p[2]) for p in row] for row in layers_1['atmosphere']['data']]
+        atmosphere_2 = [[(p[0][0], p[0][1], p[1], p[2]) for p in row] for row in layers_2['atmosphere']['data']]
+        self.assertTrue(np.allclose(atmosphere_1, atmosphere_2, rtol=0, atol=1e-12))
+
+    def test_layers_use_arrays(self):
+        self.assertEqual(self.world.layer_height.data.shape, (self.H, self.W))
+        self.assertEqual(self.world.layer_height.power.shape, (self.H, self.W, 2))
+        self.assertEqual(self.world.layer_wind.data.shape, (self.H, self.W, 2))
+        self.assertEqual(self.world.layer_atmosphere.data.shape, (self.H, self.W))
+
+    def test_biomes_check_arrays_used(self):
+        biom = ArraysTemperatureBiom(0.5)
+        biom.check = None
+
+        self.world.add_biom(biom)
+
+        self.assertEqual(self.world.get_biomes_indexes().tolist(), [[0] * self.W for y in xrange(self.H)])
+
+    def test_serialization_between_storages(self):
+        self.world.layer_atmosphere.data[5][5] = AtmospherePoint(wind=(3.0, 3.0), temperature=-1, wetness=0.3)
+        self.world.do_step()
+
+        lists_world = World.deserialize(config=BaseConfig, data=self.world.serialize())
+
+        self.assertEqual(self.world, lists_world)
+
+        # cells of lists storage are tuples, cells of arrays are serialized as lists
+        self.assertEqual(json.loads(json.dumps(self.world.serialize())), json.loads(json.dumps(lists_world.serialize())))
+
+    def test_same_steps_as_lists(self):
+        lists_world = World(w=self.W, h=self.H, config=BaseConfig, seed=self.world.seed)
+
+        for world in (lists_world, self.world):
+            world.layer_height.data[3][4] = 0.7
+            world.layer_temperature.data[6][2] = 0.9
+            world.layer_wetness.data[2][7] = 0.4
+
+            random.seed(1)
+            for i in xrange(3):
+                world.do_step()
+
+        self.assertWorldsAlmostEqual(self.world, lists_world)
+
+
+class ThreadsConfig(BaseConfig):
+    STEP_THREADS = 4
+
+
+class ThreadsWorldTests(WorldTests):
+
+    CONFIG = ThreadsConfig
+
+    def test_same_steps_as_serial(self):
+        serial_world = World(w=self.W, h=self.H, config=BaseConfig, seed=self.world.seed)
+
+        for world in (serial_world, self.world):
+            world.layer_height.data[3][4] = 0.7
+            world.layer_temperature.data[6][2] = 0.9
+
+            random.seed(1)
+            for i in xrange(3):
+                world.do_step()
+
+        self.assertEqual(self.world.serialize(), serial_world.serialize())
+
+    def test_close(self):
+        self.world.do_step()
+        pool = self.world.step_pool
+
+        self.world.close()
+        self.assertEqual(self.world._step_pool, None)
+        self.assertFalse(any(worker.is_alive() for worker in pool._pool))
+
+        self.world.do_step()
+        self.assertFalse(self.world.step_pool is pool)
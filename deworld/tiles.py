@@ -0,0 +1,157 @@
+# coding: utf-8
+import mmap
+import itertools
+import multiprocessing
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from deworld.world import World
+from deworld.exceptions import DeworldException
+
+
+_STEPPERS = {}
+_STEPPERS_IDS = itertools.count()
+
+
+def _shared_copy(array):
+    memory = mmap.mmap(-1, max(array.nbytes, 1))
+    shared = np.frombuffer(memory, dtype=array.dtype, count=array.size).reshape(array.shape)
+    shared[...] = array
+    return shared
+
+
+def _sync_tile(arguments):
+    stepper_id, tile, layout, turn = arguments
+    _STEPPERS[stepper_id].sync_tile(tile, layout, turn)
+
+
+class TiledStepper(object):
+    '''
+    do world steps in worker processes, every process syncs square tiles of world
+
+    all grids of world are moved to shared memory; every tile is extended by halo cells
+    (max halo of layers), copied into separate small world, synced there and its cells
+    (without halo) are written back to shared memory, so result is the same as of World.do_step
+
+    layers, that are not TILEABLE, are synced in current process, while tiles are processed
+
+    world MUST use arrays storage and MUST NOT be resized while stepper is used
+    '''
+
+    def __init__(self, world, tile_size=256, processes=None):
+        if not all(layer.use_arrays for layer in world.layers):
+            raise DeworldException('tiled steps can be done only for world with arrays storage')
+
+        if world.read_only:
+            raise DeworldException('world is loaded in read only mode and can not be stepped')
+
+        self.world = world
+        self.tile_size = tile_size
+
+        self.grids = []
+        for layer in world.layers:
+            for grid_name in layer.GRIDS:
+                grid = layer._map_grid(getattr(layer, grid_name), _shared_copy)
+                setattr(layer, grid_name, grid)
+                self.grids.append(grid)
+
+        self.halo = max(layer.halo for layer in world.layers if layer.TILEABLE)
+
+        self.tiles = [(x, y, min(tile_size, world.w - x), min(tile_size, world.h - y))
+                      for y in xrange(0, world.h, tile_size)
+                      for x in xrange(0, world.w, tile_size)]
+
+        self._subworlds = {}
+
+        self.id = next(_STEPPERS_IDS)
+        _STEPPERS[self.id] = self
+
+        # processes are forked here, so they get shared grids and this object
+        self.pool = multiprocessing.Pool(processes)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        del _STEPPERS[self.id]
+
+    def _grid_index(self, grid):
+        for i, shared_grid in enumerate(self.grids):
+            if shared_grid is grid:
+                return i
+        raise DeworldException('grid not found in shared memory, may be world was resized after TiledStepper creation')
+
+    def _layout(self):
+        return dict((layer.TYPE, [self._grid_index(getattr(layer, grid_name)) for grid_name in layer.GRIDS])
+                    for layer in self.world.layers)
+
+    def _window(self, tile):
+        x, y, w, h = tile
+        window_x = max(0, x - self.halo)
+        window_y = max(0, y - self.halo)
+        return (window_x,
+                window_y,
+                min(self.world.w, x + w + self.halo) - window_x,
+                min(self.world.h, y + h + self.halo) - window_y)
+
+    def _get_subworld(self, tile):
+        if tile not in self._subworlds:
+            window_x, window_y, window_w, window_h = self._window(tile)
+            subworld = World(w=window_w, h=window_h, config=self.world.config, seed=self.world.seed)
+            for layer in subworld.layers:
+                layer.origin_x = window_x
+                layer.origin_y = window_y
+            self._subworlds[tile] = subworld
+
+        return self._subworlds[tile]
+
+    def sync_tile(self, tile, layout, turn):
+        x, y, w, h = tile
+        window_x, window_y, window_w, window_h = self._window(tile)
+
+        subworld = self._get_subworld(tile)
+        subworld.turn = turn
+
+        layers = zip(self.world.layers, subworld.layers)
+
+        for layer, sublayer in layers:
+            grids = dict(zip(layer.GRIDS, [self.grids[i] for i in layout[layer.TYPE]]))
+
+            sublayer._copy_grid_into(layer._crop_grid(grids['data'], window_x, window_y, window_w, window_h), sublayer.data)
+
+            if layer.TILEABLE:
+                sublayer._copy_grid_into(layer._crop_grid(grids['power'], window_x, window_y, window_w, window_h), sublayer.power)
+
+        for layer, sublayer in layers:
+            if not layer.TILEABLE:
+                continue
+
+            sublayer.sync()
+
+            grids = dict(zip(layer.GRIDS, [self.grids[i] for i in layout[layer.TYPE]]))
+
+            for grid_name in ('next_data', 'power'):
+                sublayer._copy_grid_into(sublayer._crop_grid(getattr(sublayer, grid_name), x - window_x, y - window_y, w, h),
+                                         layer._crop_grid(grids[grid_name], x, y, w, h))
+
+    def do_step(self):
+        self.world.update_powers()
+
+        layout = self._layout()
+
+        result = self.pool.map_async(_sync_tile, [(self.id, tile, layout, self.world.turn) for tile in self.tiles])
+
+        for layer in self.world.layers:
+            if not layer.TILEABLE:
+                layer.sync()
+
+        result.get()
+
+        for layer in self.world.layers:
+            layer.apply()
+
+        self.world.turn += 1
+
+        self.world.clear_cells_cache()
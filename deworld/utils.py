@@ -1,5 +1,10 @@
 # coding: utf-8
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 E = 0.00001
 
 def copy2d(original):
@@ -43,6 +48,117 @@ def shift2d(array, dx, dy):
 
     return result
 
+def resize_array(array, new_w, new_h):
+    '''
+    numpy version of resize2d: crop or extend array by repeating its last row and column
+    '''
+    w = array.shape[1]
+    h = array.shape[0]
+
+    rows = np.minimum(np.arange(new_h), h-1)
+    columns = np.minimum(np.arange(new_w), w-1)
+
+    return array.take(rows, axis=0).take(columns, axis=1)
+
+def shift_array(array, dx, dy):
+    '''
+    numpy version of shift2d (negative shifts are ignored, like in shift2d)
+    '''
+    return np.roll(np.roll(array, max(dx, 0), axis=1), max(dy, 0), axis=0)
+
+def box_sum(array, radius):
+    '''
+    sums of array values in (2*radius+1)x(2*radius+1) window around every cell (cells outside array are ignored)
+    array can have additional channels axes after the first two
+    '''
+    h, w = array.shape[:2]
+
+    padded = np.pad(array, [(radius, radius), (radius, radius)] + [(0, 0)] * (array.ndim - 2), mode='constant')
+
+    rows = padded[0:h].copy()
+    for i in xrange(1, 2*radius+1):
+        rows += padded[i:i+h]
+
+    result = rows[:, 0:w].copy()
+    for j in xrange(1, 2*radius+1):
+        result += rows[:, j:j+w]
+
+    return result
+
+def downsample_array(array, factor, mode=False):
+    '''
+    reduce first two dimensions of array factor times: every factor x factor block of cells is replaced by mean of its values
+    or by most frequent value (if mode is True, for arrays of types); blocks on right & bottom borders can be smaller
+    '''
+    if factor == 1:
+        return array
+
+    h, w = array.shape[:2]
+
+    rows = np.arange(0, h, factor)
+    columns = np.arange(0, w, factor)
+
+    block_sum = lambda values: np.add.reduceat(np.add.reduceat(values, rows, axis=0), columns, axis=1)
+
+    if mode:
+        values = np.unique(array)
+        counts = [block_sum((array == value).astype(int)) for value in values]
+        return values[np.argmax(counts, axis=0)]
+
+    sizes = np.outer(np.diff(np.append(rows, h)), np.diff(np.append(columns, w)))
+
+    return block_sum(array.astype(float)) / sizes.reshape(sizes.shape + (1,) * (array.ndim - 2))
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+def counter_random_state(key, state=0):
+    '''
+    state of splitmix64 hash after key (integers), it can be passed to counter_random_from,
+    so common prefix of many keys is hashed only once
+    '''
+    # mixing is inlined (see _mix_64_array), since it is done for every cell by layers with lists storage
+    for number in key:
+        value = (state + (number & MASK_64) + 0x9E3779B97F4A7C15) & MASK_64
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+        state = value ^ (value >> 31)
+    return state
+
+def counter_random_from(state, *key):
+    '''
+    counter_random of prefix + key, where state = counter_random_state(prefix)
+    '''
+    return (counter_random_state(key, state) >> 11) * (1.0 / (1 << 53))
+
+def counter_random(*key):
+    '''
+    pseudo random number from [0, 1), which depends only on key (integers), splitmix64 hash of key is used
+    so numbers can be taken in any order (and in different processes) with the same result
+    '''
+    return counter_random_from(0, *key)
+
+def _mix_64_array(value):
+    value = (value ^ (value >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    value = (value ^ (value >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return value ^ (value >> np.uint64(31))
+
+def counter_random_array_from(state, *keys):
+    '''
+    numpy version of counter_random_from, keys can be integers or arrays of integers (they are broadcasted)
+    '''
+    value = np.uint64(state)
+    with np.errstate(over='ignore'):
+        for number in keys:
+            number = np.asarray(number, dtype=np.int64).astype(np.uint64)
+            value = _mix_64_array(value + number + np.uint64(0x9E3779B97F4A7C15))
+    return (value >> np.uint64(11)) * (1.0 / (1 << 53))
+
+def counter_random_array(*keys):
+    '''
+    numpy version of counter_random
+    '''
+    return counter_random_array_from(0, *keys)
+
 def prepair_to_approximation(points, default=None):
     '''
     points = [(distance or power, some value)]
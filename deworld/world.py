@@ -1,31 +1,61 @@
 # coding: utf-8
+import gzip
+import json
 import random
 import collections
+from multiprocessing.pool import ThreadPool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from deworld import layers
+from deworld.layers.atmosphere_layer import AtmosphereGrid
+from deworld.utils import counter_random, counter_random_array
+from deworld.scheduler import step_tasks, run_tasks
 from deworld.exceptions import DeworldException
 
-def _randomize_value(value_min, value_max, value, fraction):
-    delta = random.uniform(-fraction, fraction) * (value_max - value_min)
+DUMP_FORMAT = 'deworld'
+DUMP_VERSION = 1
+
+# max number of cells infos, cached by World.cell_info between steps
+CELLS_CACHE_SIZE = 4096
+
+# names of layers in serialized worlds and names of world attributes
+LAYERS_NAMES = (('height', 'layer_height'),
+                ('temperature', 'layer_temperature'),
+                ('wind', 'layer_wind'),
+                ('wetness', 'layer_wetness'),
+                ('vegetation', 'layer_vegetation'),
+                ('soil', 'layer_soil'),
+                ('atmosphere', 'layer_atmosphere'))
+
+def _randomize_value(value_min, value_max, value, fraction, random_value):
+    delta = fraction * (2 * random_value - 1) * (value_max - value_min)
     return max(value_min, min(value_max, value+delta))
 
+def _randomize_values(value_min, value_max, values, fraction, random_values):
+    delta = fraction * (2 * random_values - 1) * (value_max - value_min)
+    return np.maximum(value_min, np.minimum(value_max, values+delta))
+
 class CellInfo(collections.namedtuple('CellInfoBase', ['height', 'temperature', 'wind', 'wetness', 'vegetation', 'soil', 'atmo_wind', 'atmo_temperature', 'atmo_wetness'])):
 
     def randomize(self, seed, fraction):
-        state = random.getstate()
-        random.seed(seed)
-
-        new_cell = CellInfo(height=_randomize_value(-1.0, 1.0, self.height, fraction),
-                            temperature=_randomize_value(0.0, 1.0, self.temperature, fraction),
-                            wind=(_randomize_value(-1.0, 1.0, self.wind[0], fraction), _randomize_value(-1.0, 1.0, self.wind[1], fraction)),
-                            wetness=_randomize_value(0.0, 1.0, self.wetness, fraction),
-                            vegetation=self.vegetation,
-                            soil=_randomize_value(0.0, 1.0, self.soil, fraction),
-                            atmo_wind=(_randomize_value(-1.0, 1.0, self.atmo_wind[0], fraction), _randomize_value(-1.0, 1.0, self.atmo_wind[1], fraction)),
-                            atmo_temperature=_randomize_value(0.0, 1.0, self.atmo_temperature, fraction),
-                            atmo_wetness=_randomize_value(0.0, 1.0, self.atmo_wetness, fraction))
-        random.setstate(state)
-        return new_cell
+        '''
+        random values depend only on seed (integer), World.randomize_cells is bulk version of this method
+        '''
+        randomize = lambda index, value_min, value_max, value: _randomize_value(value_min, value_max, value, fraction, counter_random(seed, index))
+
+        return CellInfo(height=randomize(0, -1.0, 1.0, self.height),
+                        temperature=randomize(1, 0.0, 1.0, self.temperature),
+                        wind=(randomize(2, -1.0, 1.0, self.wind[0]), randomize(3, -1.0, 1.0, self.wind[1])),
+                        wetness=randomize(4, 0.0, 1.0, self.wetness),
+                        vegetation=self.vegetation,
+                        soil=randomize(5, 0.0, 1.0, self.soil),
+                        atmo_wind=(randomize(6, -1.0, 1.0, self.atmo_wind[0]), randomize(7, -1.0, 1.0, self.atmo_wind[1])),
+                        atmo_temperature=randomize(8, 0.0, 1.0, self.atmo_temperature),
+                        atmo_wetness=randomize(9, 0.0, 1.0, self.atmo_wetness))
 
     @property
     def mid_temperature(self): return (self.temperature + self.atmo_temperature) / 2.0
@@ -34,6 +64,71 @@ class CellInfo(collections.namedtuple('CellInfoBase', ['height', 'temperature',
     def mid_wetness(self): return (self.wetness + self.atmo_wetness) / 2.0
 
 
+class CellView(object):
+    '''
+    live view of cell (see World.cell_view), values are read from layers of world on every access,
+    so they are changed by steps; use info() to get CellInfo with current values
+    '''
+
+    __slots__ = ('world', 'x', 'y')
+
+    def __init__(self, world, x, y):
+        self.world = world
+        self.x = x
+        self.y = y
+
+    @property
+    def height(self): return self.world.layer_height.data[self.y][self.x]
+
+    @property
+    def temperature(self): return self.world.layer_temperature.data[self.y][self.x]
+
+    @property
+    def wind(self): return self.world.layer_wind.data[self.y][self.x]
+
+    @property
+    def wetness(self): return self.world.layer_wetness.data[self.y][self.x]
+
+    @property
+    def vegetation(self): return self.world.layer_vegetation.data[self.y][self.x]
+
+    @property
+    def soil(self): return self.world.layer_soil.data[self.y][self.x]
+
+    @property
+    def atmo_wind(self): return self.world.layer_atmosphere.data[self.y][self.x].wind
+
+    @property
+    def atmo_temperature(self): return self.world.layer_atmosphere.data[self.y][self.x].temperature
+
+    @property
+    def atmo_wetness(self): return self.world.layer_atmosphere.data[self.y][self.x].wetness
+
+    mid_temperature = CellInfo.mid_temperature
+    mid_wetness = CellInfo.mid_wetness
+
+    def __iter__(self):
+        return iter(self.info())
+
+    def __eq__(self, other):
+        return self.info() == (other.info() if isinstance(other, CellView) else other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    # view is changed with world, so it can not be hashed
+    __hash__ = None
+
+    def info(self):
+        '''
+        CellInfo with current values of cell
+        '''
+        return self.world._read_cell_info(self.x, self.y)
+
+    def randomize(self, seed, fraction):
+        return self.info().randomize(seed, fraction)
+
+
 class CellPowerInfo(collections.namedtuple('CellPowerInfoBase', ['height', 'temperature', 'wind', 'wetness', 'vegetation', 'soil'])):
     pass
 
@@ -47,14 +142,30 @@ class World(object):
                  layer_atmosphere=None,
                  layer_wetness=None,
                  layer_vegetation=None,
-                 layer_soil=None):
+                 layer_soil=None,
+                 seed=None,
+                 turn=0):
         self.config = config
         self.w = w
         self.h = h
 
+        # seed of random numbers, which are used by layers (they depend only on seed, turn and cell coordinates)
+        # if seed is not specified, it is taken from os.urandom, so global random module state is not used and not changed
+        self.seed = random.SystemRandom().randint(0, 2**32-1) if seed is None else seed
+        self.turn = turn
+
         self.power_points = {}
         self.biomes = []
 
+        # stamps keys of static power points, which powers are added to base powers of layers
+        self._static_powers_key = None
+
+        # powers were not loaded with world, they are recalculated on first request (or on next step)
+        self.powers_outdated = False
+
+        # world is loaded from read only snapshot (see snapshots.load_snapshot), so it can not be stepped
+        self.read_only = False
+
         self.layer_height = layers.HeightLayer(world=self) if layer_height is None else layers.HeightLayer.deserialize(world=self, data=layer_height)
         self.layer_temperature = layers.TemperatureLayer(world=self) if layer_temperature is None else layers.TemperatureLayer.deserialize(world=self, data=layer_temperature)
         self.layer_wind = layers.WindLayer(world=self) if layer_wind is None else layers.WindLayer.deserialize(world=self, data=layer_wind)
@@ -63,6 +174,45 @@ class World(object):
         self.layer_vegetation = layers.VegetationLayer(world=self) if layer_vegetation is None else layers.VegetationLayer.deserialize(world=self, data=layer_vegetation)
         self.layer_soil = layers.SoilLayer(world=self) if layer_soil is None else layers.SoilLayer.deserialize(world=self, data=layer_soil)
 
+        self._step_tasks = step_tasks(self.layers)
+        self._step_pool = None
+
+        self._cells_infos = {}
+
+    @property
+    def layers(self):
+        return [self.layer_height,
+                self.layer_temperature,
+                self.layer_wind,
+                self.layer_wetness,
+                self.layer_vegetation,
+                self.layer_soil,
+                self.layer_atmosphere]
+
+    def named_layers(self):
+        return [(layer_name, getattr(self, attribute_name)) for layer_name, attribute_name in LAYERS_NAMES]
+
+    @property
+    def step_pool(self):
+        threads = getattr(self.config, 'STEP_THREADS', 1)
+
+        if threads <= 1:
+            return None
+
+        if self._step_pool is None:
+            self._step_pool = ThreadPool(threads)
+
+        return self._step_pool
+
+    def close(self):
+        '''
+        stop threads of step pool (world can be stepped after close, pool will be created again)
+        '''
+        if self._step_pool is not None:
+            self._step_pool.close()
+            self._step_pool.join()
+            self._step_pool = None
+
     def clear_power_points(self):
         self.power_points.clear()
 
@@ -77,18 +227,63 @@ class World(object):
     def add_biom(self, biom):
         self.biomes.append(biom)
 
+    def _read_cell_info(self, x, y):
+        if not self.layer_height.use_arrays:
+            return CellInfo(height=self.layer_height.data[y][x],
+                            temperature=self.layer_temperature.data[y][x],
+                            wind=self.layer_wind.data[y][x],
+                            wetness=self.layer_wetness.data[y][x],
+                            vegetation=self.layer_vegetation.data[y][x],
+                            soil=self.layer_soil.data[y][x],
+                            atmo_wind=self.layer_atmosphere.data[y][x].wind,
+                            atmo_temperature=self.layer_atmosphere.data[y][x].temperature,
+                            atmo_wetness=self.layer_atmosphere.data[y][x].wetness)
+
+        # values are copied from arrays, so info is not changed with world (like for lists storage)
+        atmo_wind_x, atmo_wind_y, atmo_temperature, atmo_wetness = self.layer_atmosphere.data.channels[:, y, x].tolist()
+
+        return CellInfo(height=self.layer_height.data[y, x].item(),
+                        temperature=self.layer_temperature.data[y, x].item(),
+                        wind=tuple(self.layer_wind.data[y, x].tolist()),
+                        wetness=self.layer_wetness.data[y, x].item(),
+                        vegetation=self.layer_vegetation.data[y, x].item(),
+                        soil=self.layer_soil.data[y, x].item(),
+                        atmo_wind=(atmo_wind_x, atmo_wind_y),
+                        atmo_temperature=atmo_temperature,
+                        atmo_wetness=atmo_wetness)
+
     def cell_info(self, x, y):
-        return CellInfo(height=self.layer_height.data[y][x],
-                        temperature=self.layer_temperature.data[y][x],
-                        wind=self.layer_wind.data[y][x],
-                        wetness=self.layer_wetness.data[y][x],
-                        vegetation=self.layer_vegetation.data[y][x],
-                        soil=self.layer_soil.data[y][x],
-                        atmo_wind=self.layer_atmosphere.data[y][x].wind,
-                        atmo_temperature=self.layer_atmosphere.data[y][x].temperature,
-                        atmo_wetness=self.layer_atmosphere.data[y][x].wetness)
+        '''
+        CellInfo with values of cell, infos are cached until next step, resize or clear_cells_cache call
+        (at most CELLS_CACHE_SIZE infos, cache is cleared, when it is full)
+        '''
+        cell = self._cells_infos.get((x, y))
+
+        if cell is None:
+            if len(self._cells_infos) >= CELLS_CACHE_SIZE:
+                self._cells_infos.clear()
+
+            cell = self._read_cell_info(x, y)
+            self._cells_infos[(x, y)] = cell
+
+        return cell
+
+    def cell_view(self, x, y):
+        '''
+        live view of cell (CellView), which values are read from layers on access
+        '''
+        return CellView(self, x, y)
+
+    def clear_cells_cache(self):
+        '''
+        MUST be called after direct changes of layers data, if cell_info is used
+        '''
+        self._cells_infos.clear()
 
     def cell_power_info(self, x, y):
+        if self.powers_outdated:
+            self.update_powers()
+
         return CellPowerInfo(height=self.layer_height.power[y][x],
                              temperature=self.layer_temperature.power[y][x],
                              wind=self.layer_wind.power[y][x],
@@ -96,35 +291,142 @@ class World(object):
                              vegetation=self.layer_vegetation.power[y][x],
                              soil=self.layer_soil.power[y][x] )
 
-    def _select_biom(self, x, y):
-        # for biom in self.biomes:
-        #     if biom.check(self.cell_info(x, y)):
-        #         return biom
+    def cells_info(self):
+        '''
+        CellInfo with arrays of all cells (arrays storage only)
+        '''
+        return CellInfo(height=self.layer_height.data,
+                        temperature=self.layer_temperature.data,
+                        wind=self.layer_wind.data,
+                        wetness=self.layer_wetness.data,
+                        vegetation=self.layer_vegetation.data,
+                        soil=self.layer_soil.data,
+                        atmo_wind=self.layer_atmosphere.data.wind,
+                        atmo_temperature=self.layer_atmosphere.data.temperature,
+                        atmo_wetness=self.layer_atmosphere.data.wetness)
+
+    def cells_arrays(self, x=0, y=0, w=None, h=None):
+        '''
+        CellInfo with arrays of cells of rectangle region (whole world by default) for any storage
+        (for arrays storage arrays are views of cells_info arrays)
+        '''
+        w = self.w - x if w is None else w
+        h = self.h - y if h is None else h
+
+        if self.layer_height.use_arrays:
+            return CellInfo(*[values[y:y+h, x:x+w] for values in self.cells_info()])
+
+        region = lambda grid: [row[x:x+w] for row in grid[y:y+h]]
+
+        atmosphere = AtmosphereGrid.from_points(region(self.layer_atmosphere.data))
+
+        return CellInfo(height=np.array(region(self.layer_height.data)),
+                        temperature=np.array(region(self.layer_temperature.data)),
+                        wind=np.array(region(self.layer_wind.data)),
+                        wetness=np.array(region(self.layer_wetness.data)),
+                        vegetation=np.array(region(self.layer_vegetation.data)),
+                        soil=np.array(region(self.layer_soil.data)),
+                        atmo_wind=atmosphere.wind,
+                        atmo_temperature=atmosphere.temperature,
+                        atmo_wetness=atmosphere.wetness)
+
+    def randomize_cells(self, seeds, fraction, x=0, y=0):
+        '''
+        bulk version of cell_info(...).randomize for rectangle region of world with top left corner in (x, y)
+
+        seeds - 2d array of integer seeds of region cells (region size is defined by its shape)
+        returns CellInfo with arrays of randomized values, they are the same as returned by randomize with the same seeds
+        '''
+        seeds = np.asarray(seeds)
+        h, w = seeds.shape
+
+        if x < 0 or y < 0 or x + w > self.w or y + h > self.h:
+            raise DeworldException('region %r of randomized cells is out of world %r' % ((x, y, w, h), (self.w, self.h)))
+
+        cells = self.cells_arrays(x, y, w, h)
+
+        randomize = lambda index, value_min, value_max, values: _randomize_values(value_min, value_max, values, fraction, counter_random_array(seeds, index))
+
+        return CellInfo(height=randomize(0, -1.0, 1.0, cells.height),
+                        temperature=randomize(1, 0.0, 1.0, cells.temperature),
+                        wind=np.dstack((randomize(2, -1.0, 1.0, cells.wind[:, :, 0]), randomize(3, -1.0, 1.0, cells.wind[:, :, 1]))),
+                        wetness=randomize(4, 0.0, 1.0, cells.wetness),
+                        vegetation=cells.vegetation.copy(),
+                        soil=randomize(5, 0.0, 1.0, cells.soil),
+                        atmo_wind=np.dstack((randomize(6, -1.0, 1.0, cells.atmo_wind[:, :, 0]), randomize(7, -1.0, 1.0, cells.atmo_wind[:, :, 1]))),
+                        atmo_temperature=randomize(8, 0.0, 1.0, cells.atmo_temperature),
+                        atmo_wetness=randomize(9, 0.0, 1.0, cells.atmo_wetness))
+
+    def _get_biomes_indexes_lists(self):
+        biomes_indexes = []
+
+        for y in xrange(self.h):
+            row = []
+            biomes_indexes.append(row)
+            for x in xrange(self.w):
+                cell = self._read_cell_info(x, y)
+
+                best_points = 0
+                best_index = -1
+
+                for i, biom in enumerate(self.biomes):
+                    points = biom.check(cell)
+                    if best_index == -1 or best_points < points:
+                        best_points = points
+                        best_index = i
+
+                row.append(best_index)
+
+        return biomes_indexes
 
-        best_points = 0
-        best_biom = None
+    def _get_biomes_indexes_arrays(self):
+        if not self.biomes:
+            return np.full((self.h, self.w), -1, dtype=int)
 
-        for biom in self.biomes:
-            points =  biom.check(self.cell_info(x, y))
-            if best_biom is None or best_points < points:
-                best_points = points
-                best_biom = biom
+        cells = None
+        points = np.empty((len(self.biomes), self.h, self.w))
 
-        return best_biom
+        for i, biom in enumerate(self.biomes):
+            if hasattr(biom, 'check_arrays'):
+                points[i] = biom.check_arrays(self.cells_info())
+                continue
 
-        # raise DeworldException('can not find biom for coordinates (%d, %d). Last biom in biomes list always MUST accept any cell.' % (x, y))
+            if cells is None:
+                cells = [[self._read_cell_info(x, y) for x in xrange(self.w)] for y in xrange(self.h)]
+
+            points[i] = [[biom.check(cell) for cell in row] for row in cells]
+
+        # argmax returns first of best biomes, like per cell selection
+        return points.argmax(axis=0)
+
+    def get_biomes_indexes(self):
+        '''
+        grid of indexes of best biomes in self.biomes for every cell (-1 if there are no biomes):
+        int numpy array with shape (h, w) for any storage, list of rows only if numpy is not installed
+
+        biom can define check_arrays(cells), vectorized version of check, which receives CellInfo with arrays of all cells
+        (see cells_info) and returns array of points; it is used with arrays storage, otherwise check is called for every cell
+        '''
+        if self.layer_height.use_arrays:
+            return self._get_biomes_indexes_arrays()
+
+        biomes_indexes = self._get_biomes_indexes_lists()
+
+        if np is None:
+            return biomes_indexes
+
+        return np.array(biomes_indexes, dtype=int).reshape((self.h, self.w))
 
     def get_biomes_map(self):
+        biomes_indexes = self.get_biomes_indexes()
 
-        biom_map = []
+        if np is not None:
+            biomes_indexes = biomes_indexes.tolist()
 
-        for y in xrange(self.h):
-            row = []
-            biom_map.append(row)
-            for x in xrange(self.w):
-                row.append(self._select_biom(x, y))
+        # -1 index means no biom
+        biomes = self.biomes + [None]
 
-        return biom_map
+        return [[biomes[i] for i in row] for row in biomes_indexes]
 
 
     def resize(self, new_w, new_h):
@@ -137,6 +439,8 @@ class World(object):
         self.w = new_w
         self.h = new_h
 
+        self.clear_cells_cache()
+
         self.layer_height.resize(new_w, new_h, dx, dy)
         self.layer_temperature.resize(new_w, new_h, dx, dy)
         self.layer_wind.resize(new_w, new_h, dx, dy)
@@ -148,65 +452,211 @@ class World(object):
         return dx, dy
 
 
-    def do_step(self):
+    def update_powers(self):
+
+        static_points = [power_point for power_point in self.power_points.values() if power_point.static]
+
+        static_powers_key = [(power_point.name, power_point.stamp_key(self)) for power_point in static_points]
+
+        if static_powers_key != self._static_powers_key:
+            # static points are added, removed or moved, so base powers are rebuilt
+            for layer in self.layers:
+                layer.clear_powers()
+
+            for power_point in static_points:
+                power_point.update_world(self)
 
-        self.layer_height.reset_powers()
-        self.layer_temperature.reset_powers()
-        self.layer_wind.reset_powers()
-        self.layer_wetness.reset_powers()
-        self.layer_vegetation.reset_powers()
-        self.layer_soil.reset_powers()
-        self.layer_atmosphere.reset_powers()
+            for layer in self.layers:
+                layer.fix_powers()
 
+            self._static_powers_key = static_powers_key
+        else:
+            for layer in self.layers:
+                layer.reset_powers()
 
         for power_point in self.power_points.values():
-            power_point.update_world(self)
-
-        self.layer_height.sync()
-        self.layer_temperature.sync()
-        self.layer_wind.sync()
-        self.layer_wetness.sync()
-        self.layer_vegetation.sync()
-        self.layer_soil.sync()
-        self.layer_atmosphere.sync()
-
-        self.layer_height.apply()
-        self.layer_temperature.apply()
-        self.layer_wind.apply()
-        self.layer_wetness.apply()
-        self.layer_vegetation.apply()
-        self.layer_soil.apply()
-        self.layer_atmosphere.apply()
-
-
-    def serialize(self):
+            if not power_point.static:
+                power_point.update_world(self)
+
+        self.powers_outdated = False
+
+    def check_loaded_powers(self, loaded_grids):
+        '''
+        loaded_grids - (layer_name, grid_name) of grids, loaded into world (from serialized data, dump, snapshot or delta)
+
+        if powers of some layers were not loaded, they are recalculated on first request (or on next step)
+        '''
+        if any((layer_name, 'power') not in loaded_grids
+               for layer_name, layer in self.named_layers()
+               if 'power' in layer.SNAPSHOT_GRIDS):
+            self.powers_outdated = True
+
+    def do_step(self):
+
+        if self.read_only:
+            raise DeworldException('world is loaded in read only mode and can not be stepped')
+
+        self.update_powers()
+
+        # syncs & applies of layers, concurrent if config allows it
+        run_tasks(self._step_tasks, pool=self.step_pool)
+
+        self.turn += 1
+
+        self.clear_cells_cache()
+
+    def run(self, steps_number, callback=None, every=1):
+        '''
+        do steps_number steps, callback(step, world) is called after every `every` steps (step numbers start from 1)
+        '''
+        if every < 1:
+            raise DeworldException('callback can be called only after positive number of steps, not after %r' % every)
+
+        for step in xrange(1, steps_number+1):
+            self.do_step()
+
+            if callback is not None and step % every == 0:
+                callback(step, self)
+
+
+    def serialize(self, powers=True):
+        '''
+        powers - save powers of layers too, otherwise they are recalculated after loading
+        '''
         return {'w': self.w,
                 'h': self.h,
+                'seed': self.seed,
+                'turn': self.turn,
                 'layers': {
-                    'height': self.layer_height.serialize(),
-                    'temperature': self.layer_temperature.serialize(),
-                    'wind': self.layer_wind.serialize(),
-                    'wetness': self.layer_wetness.serialize(),
-                    'vegetation': self.layer_vegetation.serialize(),
-                    'soil': self.layer_soil.serialize(),
-                    'atmosphere': self.layer_atmosphere.serialize()
+                    'height': self.layer_height.serialize(powers=powers),
+                    'temperature': self.layer_temperature.serialize(powers=powers),
+                    'wind': self.layer_wind.serialize(powers=powers),
+                    'wetness': self.layer_wetness.serialize(powers=powers),
+                    'vegetation': self.layer_vegetation.serialize(powers=powers),
+                    'soil': self.layer_soil.serialize(powers=powers),
+                    'atmosphere': self.layer_atmosphere.serialize(powers=powers)
                     }
                 }
 
     @classmethod
     def deserialize(cls, config, data):
+        '''
+        grids are loaded into layers row by row (see load), so whole grids are not converted at once
+        '''
+        world = cls(w=data['w'], h=data['h'], config=config, seed=data.get('seed'), turn=data.get('turn', 0))
+
+        layers_data = data['layers']
 
-        world = cls(w=data['w'], h=data['h'], config=config,
-                    layer_height=data['layers']['height'],
-                    layer_temperature=data['layers']['temperature'],
-                    layer_wind=data['layers']['wind'],
-                    layer_atmosphere=data['layers']['atmosphere'],
-                    layer_wetness=data['layers']['wetness'],
-                    layer_vegetation=data['layers']['vegetation'],
-                    layer_soil=data['layers'].get('soil'))
+        # soil layer is absent in worlds, serialized before it was added
+        loaded_grids = world._load_grids(((layer_name, grid_name, iter(layers_data[layer_name][grid_name]))
+                                          for layer_name, layer in world.named_layers()
+                                          for grid_name in layer.SNAPSHOT_GRIDS
+                                          if grid_name in (layers_data.get(layer_name) or {})),
+                                         optional_layers=('soil',))
+
+        world.check_loaded_powers(loaded_grids)
+
+        return world
+
+    def _load_grids(self, grids, optional_layers=()):
+        '''
+        fill grids of layers from iterable of (layer_name, grid_name, rows), rows are taken from iterator one by one,
+        data grids of all layers (except optional_layers) MUST be loaded
+
+        returns set of (layer_name, grid_name) of loaded grids
+        '''
+        layers = dict(self.named_layers())
+
+        loaded_grids = set()
+
+        for layer_name, grid_name, rows in grids:
+            layer = layers.get(layer_name)
+
+            if layer is None or grid_name not in layer.SNAPSHOT_GRIDS:
+                raise DeworldException('unknown grid %r of layer %r' % (grid_name, layer_name))
+
+            grid = getattr(layer, grid_name)
+
+            for y in xrange(self.h):
+                row = next(rows, None)
+
+                if row is None or len(row) != self.w:
+                    raise DeworldException('wrong row %d of grid %r of layer %r' % (y, grid_name, layer_name))
+
+                layer._load_row(grid, y, row)
+
+            loaded_grids.add((layer_name, grid_name))
+
+        missed_layers = [layer_name for layer_name, layer in self.named_layers()
+                         if (layer_name, 'data') not in loaded_grids and layer_name not in optional_layers]
+
+        if missed_layers:
+            raise DeworldException('data of layers %r are not loaded' % missed_layers)
+
+        return loaded_grids
+
+    def dump(self, fileobj, compressed=False, powers=False):
+        '''
+        write world to file object as json lines: header and then description & rows of every grid of every layer
+        unlike serialize, only one row is converted to json at once
+
+        powers - save powers of layers too (see serialize)
+        '''
+        if compressed:
+            fileobj = gzip.GzipFile(fileobj=fileobj, mode='wb')
+
+        fileobj.write(json.dumps({'format': DUMP_FORMAT,
+                                  'version': DUMP_VERSION,
+                                  'w': self.w,
+                                  'h': self.h,
+                                  'seed': self.seed,
+                                  'turn': self.turn}) + '\n')
+
+        for layer_name, layer in self.named_layers():
+            for grid_name in layer.snapshot_grids(powers=powers):
+                fileobj.write(json.dumps({'layer': layer_name, 'grid': grid_name}) + '\n')
+
+                grid = getattr(layer, grid_name)
+
+                for y in xrange(self.h):
+                    fileobj.write(json.dumps(layer._dump_row(grid, y)) + '\n')
+
+        if compressed:
+            # closes only gzip stream, not file object
+            fileobj.close()
+
+    @classmethod
+    def load(cls, fileobj, config, compressed=False):
+        '''
+        read world, written by dump, row by row
+        '''
+        if compressed:
+            fileobj = gzip.GzipFile(fileobj=fileobj, mode='rb')
+
+        try:
+            header = json.loads(fileobj.readline())
+
+            if header.get('format') != DUMP_FORMAT or header.get('version') != DUMP_VERSION:
+                raise DeworldException('wrong world dump format: %r, version: %r' % (header.get('format'), header.get('version')))
+
+            world = cls(w=header['w'], h=header['h'], config=config, seed=header['seed'], turn=header['turn'])
+
+            loaded_grids = world._load_grids(cls._read_dump_grids(fileobj, world.h))
+
+        except (ValueError, KeyError, TypeError, IOError, EOFError) as e:
+            # broken json, truncated or not gzipped stream
+            raise DeworldException('wrong world dump: %s' % e)
+
+        world.check_loaded_powers(loaded_grids)
 
         return world
 
+    @staticmethod
+    def _read_dump_grids(fileobj, h):
+        for line in iter(fileobj.readline, ''):
+            description = json.loads(line)
+            yield description['layer'], description['grid'], (json.loads(fileobj.readline()) for y in xrange(h))
+
     def __eq__(self, other):
         return (self.w == other.w and
                 self.h == other.h and
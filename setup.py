@@ -11,5 +11,6 @@ setuptools.setup(
     license = 'LICENSE',
     description = "DEveloping WORLD - python world generator",
     long_description = open('README.md').read(),
+    extras_require = {'arrays': ['numpy']}, # numpy is needed only for STORAGE_TYPE.ARRAYS and cartographer.FramesWriter, without it images are drawn cell by cell
     include_package_data = True # setuptools-git MUST be installed
 )